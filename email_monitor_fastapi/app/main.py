@@ -9,6 +9,7 @@ import os
 import json
 import logging
 import re
+import time
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any
@@ -40,6 +41,8 @@ except ImportError:
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+from .result_files import latest_summary_files, read_json
+
 # Import Redis queue
 try:
     from .redis_queue import RedisEmailQueue, EmailAttachmentData
@@ -89,7 +92,6 @@ class FileUploadHandler(FileSystemEventHandler):
             return
         
         # Wait a moment to ensure file is fully written
-        import time
         time.sleep(0.5)
         
         try:
@@ -809,29 +811,17 @@ async def get_recent_results():
     results = []
     
     try:
-        # Check for both summary files in subdirectories and root directory files
-        for message_dir in monitor.attachments_dir.iterdir():
-            if message_dir.is_dir():
-                # Check for processing summary in subdirectory
-                summary_file = message_dir / "processing_summary.json"
-                if summary_file.exists():
-                    with open(summary_file) as f:
-                        summary = json.load(f)
-                        results.append(summary["email_info"])
-        
-        # Also check for summary files directly in root directory (legacy format)
-        for summary_file in monitor.attachments_dir.glob("*_processing_summary_*.json"):
-            if summary_file.is_file():
-                try:
-                    with open(summary_file) as f:
-                        summary = json.load(f)
-                        results.append(summary.get("email_info", {}))
-                except Exception:
-                    continue
+        # Only the newest summaries (by mtime) are read; subdirectories plus legacy root-level files
+        for summary_file in latest_summary_files(monitor.attachments_dir, 10, include_legacy=True):
+            try:
+                summary = read_json(summary_file)
+                results.append(summary.get("email_info", {}))
+            except Exception:
+                continue
         
         # Sort by processed date
         results.sort(key=lambda x: x.get("processed_date", ""), reverse=True)
-        return {"recent_results": results[:10]}
+        return {"recent_results": results}
         
     except Exception as e:
         return {"error": str(e), "recent_results": []}
@@ -851,15 +841,11 @@ async def get_email_details(message_id: str):
         if not message_dir:
             raise HTTPException(status_code=404, detail="Email not found")
         
-        summary_file = message_dir / "processing_summary.json"
-        if not summary_file.exists():
+        try:
+            return read_json(message_dir / "processing_summary.json")
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="Processing summary not found")
         
-        with open(summary_file) as f:
-            summary = json.load(f)
-        
-        return summary
-        
     except HTTPException:
         raise
     except Exception as e:
@@ -884,19 +870,17 @@ async def get_email_json(message_id: str):
         result = {"email_summary": None, "attachments": []}
         
         # Get summary
-        summary_file = message_dir / "processing_summary.json"
-        if summary_file.exists():
-            with open(summary_file) as f:
-                result["email_summary"] = json.load(f)
+        try:
+            result["email_summary"] = read_json(message_dir / "processing_summary.json")
+        except FileNotFoundError:
+            pass
         
         # Get all processed attachments
         for file_path in message_dir.glob("*.processed.json"):
-            with open(file_path) as f:
-                attachment_data = json.load(f)
-                result["attachments"].append({
-                    "filename": file_path.name.replace(".processed.json", ""),
-                    "processed_content": attachment_data
-                })
+            result["attachments"].append({
+                "filename": file_path.name.replace(".processed.json", ""),
+                "processed_content": read_json(file_path)
+            })
         
         return result
         
@@ -921,13 +905,11 @@ async def get_attachment_json(message_id: str, filename: str):
             raise HTTPException(status_code=404, detail="Email not found")
         
         # Find the processed JSON file
-        json_file = message_dir / f"{filename}.processed.json"
-        if not json_file.exists():
+        try:
+            return read_json(message_dir / f"{filename}.processed.json")
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="Processed file not found")
         
-        with open(json_file) as f:
-            return json.load(f)
-        
     except HTTPException:
         raise
     except Exception as e:
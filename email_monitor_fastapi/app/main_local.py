@@ -6,10 +6,12 @@ Modified version that uses a local mock server instead of Microsoft Graph API
 import os
 import json
 import logging
+import time
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any
 import requests
+import httpx
 import asyncio
 
 from fastapi import FastAPI, BackgroundTasks, HTTPException, Request
@@ -25,6 +27,9 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from file_processor import AttachmentReader
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from app.result_files import latest_summary_files, read_json
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -40,8 +45,17 @@ logger = logging.getLogger(__name__)
 class MockGraphEmailClient:
     """Mock Graph API client that uses local server"""
     
-    def __init__(self, mock_server_url: str = "http://localhost:5001"):
+    # Tokens shared by every client for the same server: url -> (token, expires_at)
+    _token_cache: Dict[str, tuple] = {}
+    # Shorter than the 30s poll interval, so every scheduled cycle re-checks that
+    # the server is reachable while bursts of calls within a cycle share one check
+    TOKEN_LIFETIME = 25
+    
+    def __init__(self, mock_server_url: str = "http://localhost:5001",
+                 session: requests.Session = None):
         self.mock_server_url = mock_server_url
+        # Pass a shared session to reuse pooled connections across clients
+        self.session = session or requests.Session()
         self.access_token = None
         self.delta_link = None
         
@@ -66,13 +80,30 @@ class MockGraphEmailClient:
         except Exception as e:
             logger.warning(f"Could not save delta link: {e}")
     
-    def authenticate(self) -> bool:
-        """Mock authentication with local server"""
+    @classmethod
+    def clear_token_cache(cls):
+        """Forget cached tokens so the next authenticate() hits the server"""
+        cls._token_cache.clear()
+    
+    def authenticate(self, force: bool = False) -> bool:
+        """Mock authentication with local server
+        
+        Reuses a cached token for this server until it expires, unless force
+        is set.
+        """
+        cached = self._token_cache.get(self.mock_server_url)
+        if not force and cached and time.time() < cached[1]:
+            self.access_token = cached[0]
+            return True
+        
         try:
             # Check if mock server is healthy
-            response = requests.get(f"{self.mock_server_url}/health", timeout=5)
+            response = self.session.get(f"{self.mock_server_url}/health", timeout=5)
             if response.status_code == 200:
                 self.access_token = "mock_token_local"
+                self._token_cache[self.mock_server_url] = (
+                    self.access_token, time.time() + self.TOKEN_LIFETIME
+                )
                 logger.info("Successfully connected to mock email server")
                 return True
             else:
@@ -83,46 +114,65 @@ class MockGraphEmailClient:
             logger.error(f"Cannot connect to mock server: {e}")
             return False
     
+    def _delta_url(self) -> str:
+        """Use stored delta link for incremental sync, or start fresh"""
+        if self.delta_link:
+            logger.info("Using delta sync - only processing new emails")
+            return self.delta_link
+        logger.info("First run - processing all emails")
+        return f"{self.mock_server_url}/v1.0/me/messages/delta"
+    
+    def _handle_delta_response(self, data: Dict[str, Any], email_groups: List[str] = None) -> List[Dict[str, Any]]:
+        """Filter a delta response page and remember its delta link"""
+        # Filter out deleted items
+        messages = [msg for msg in data.get("value", []) if "@removed" not in msg]
+        
+        # Filter by email groups if specified
+        if email_groups and messages:
+            filtered = []
+            for msg in messages:
+                sender = msg.get("from", {}).get("emailAddress", {}).get("address", "").lower()
+                if any(group.lower() in sender for group in email_groups):
+                    filtered.append(msg)
+            messages = filtered
+        
+        # Handle delta link
+        delta_link = data.get("@odata.deltaLink")
+        if delta_link:
+            self.delta_link = delta_link
+            self._save_delta_link()
+        
+        return messages
+    
     def get_new_messages(self, email_groups: List[str] = None) -> List[Dict[str, Any]]:
         """Get NEW messages from mock server using delta query"""
         if not self.access_token:
             return []
         
-        # Use stored delta link for incremental sync, or start fresh
-        if self.delta_link:
-            url = self.delta_link
-            logger.info("Using delta sync - only processing new emails")
-        else:
-            url = f"{self.mock_server_url}/v1.0/me/messages/delta"
-            logger.info("First run - processing all emails")
+        try:
+            response = self.session.get(self._delta_url(), timeout=30)
+            response.raise_for_status()
+            new_messages = self._handle_delta_response(response.json(), email_groups)
+        except Exception as e:
+            logger.error(f"Error fetching messages: {e}")
+            return []
         
-        new_messages = []
+        logger.info(f"Found {len(new_messages)} new messages")
+        return new_messages
+    
+    async def aget_new_messages(self, client: httpx.AsyncClient,
+                                email_groups: List[str] = None) -> List[Dict[str, Any]]:
+        """Async get_new_messages over a caller-owned httpx.AsyncClient
+        
+        Lets callers overlap many delta queries on one connection pool.
+        """
+        if not self.access_token:
+            return []
         
         try:
-            response = requests.get(url, timeout=30)
+            response = await client.get(self._delta_url(), timeout=30)
             response.raise_for_status()
-            data = response.json()
-            
-            # Filter out deleted items
-            messages = [msg for msg in data.get("value", []) if "@removed" not in msg]
-            
-            # Filter by email groups if specified
-            if email_groups and messages:
-                filtered = []
-                for msg in messages:
-                    sender = msg.get("from", {}).get("emailAddress", {}).get("address", "").lower()
-                    if any(group.lower() in sender for group in email_groups):
-                        filtered.append(msg)
-                messages = filtered
-            
-            new_messages.extend(messages)
-            
-            # Handle delta link
-            delta_link = data.get("@odata.deltaLink")
-            if delta_link:
-                self.delta_link = delta_link
-                self._save_delta_link()
-                    
+            new_messages = self._handle_delta_response(response.json(), email_groups)
         except Exception as e:
             logger.error(f"Error fetching messages: {e}")
             return []
@@ -138,7 +188,7 @@ class MockGraphEmailClient:
         url = f"{self.mock_server_url}/v1.0/me/messages/{message_id}/attachments"
         
         try:
-            response = requests.get(url, timeout=30)
+            response = self.session.get(url, timeout=30)
             response.raise_for_status()
             return response.json().get("value", [])
         except Exception as e:
@@ -153,12 +203,45 @@ class MockGraphEmailClient:
         url = f"{self.mock_server_url}/v1.0/me/messages/{message_id}/attachments/{attachment_id}/$value"
         
         try:
-            response = requests.get(url, timeout=60)
+            response = self.session.get(url, timeout=60)
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            logger.error(f"Error downloading attachment: {e}")
+            return b""
+    
+    async def adownload_attachment(self, client: httpx.AsyncClient, message_id: str, attachment_id: str) -> bytes:
+        """Async download_attachment over a caller-owned httpx.AsyncClient"""
+        if not self.access_token:
+            return b""
+        
+        url = f"{self.mock_server_url}/v1.0/me/messages/{message_id}/attachments/{attachment_id}/$value"
+        
+        try:
+            response = await client.get(url, timeout=60)
             response.raise_for_status()
             return response.content
         except Exception as e:
             logger.error(f"Error downloading attachment: {e}")
             return b""
+    
+    async def adownload_attachment_size(self, client: httpx.AsyncClient, message_id: str, attachment_id: str) -> int:
+        """Stream an attachment and return its size without keeping the body"""
+        if not self.access_token:
+            return 0
+        
+        url = f"{self.mock_server_url}/v1.0/me/messages/{message_id}/attachments/{attachment_id}/$value"
+        size = 0
+        
+        try:
+            async with client.stream("GET", url, timeout=60) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(64 * 1024):
+                    size += len(chunk)
+            return size
+        except Exception as e:
+            logger.error(f"Error downloading attachment: {e}")
+            return 0
 
 
 class EmailMonitor:
@@ -193,13 +276,14 @@ class EmailMonitor:
         try:
             logger.info("Starting email processing cycle (LOCAL MODE)")
             
+            # Blocking HTTP calls run in worker threads so concurrent cycles overlap
             # Authenticate with mock server
-            if not self.graph_client.authenticate():
+            if not await asyncio.to_thread(self.graph_client.authenticate):
                 self.stats['errors'] += 1
                 return
             
             # Get only NEW messages (idempotency handled by delta query)
-            messages = self.graph_client.get_new_messages(self.email_groups)
+            messages = await asyncio.to_thread(self.graph_client.get_new_messages, self.email_groups)
             
             if not messages:
                 logger.info("No new messages to process")
@@ -230,7 +314,7 @@ class EmailMonitor:
         
         try:
             # Get attachments
-            attachments = self.graph_client.get_attachments(message_id)
+            attachments = await asyncio.to_thread(self.graph_client.get_attachments, message_id)
             if not attachments:
                 return
             
@@ -254,8 +338,8 @@ class EmailMonitor:
                         continue
                 
                 # Download attachment
-                attachment_data = self.graph_client.download_attachment(
-                    message_id, attachment.get("id", "")
+                attachment_data = await asyncio.to_thread(
+                    self.graph_client.download_attachment, message_id, attachment.get("id", "")
                 )
                 
                 if not attachment_data:
@@ -263,7 +347,7 @@ class EmailMonitor:
                 
                 # Save attachment
                 attachment_path = message_dir / attachment_name
-                attachment_path.write_bytes(attachment_data)
+                await asyncio.to_thread(attachment_path.write_bytes, attachment_data)
                 
                 # Process content
                 processed = self.attachment_reader.read_attachment(
@@ -397,17 +481,12 @@ async def get_recent_results():
     results = []
     
     try:
-        for message_dir in monitor.attachments_dir.iterdir():
-            if message_dir.is_dir():
-                summary_file = message_dir / "processing_summary.json"
-                if summary_file.exists():
-                    with open(summary_file) as f:
-                        summary = json.load(f)
-                        results.append(summary["email_info"])
+        for summary_file in latest_summary_files(monitor.attachments_dir, 10):
+            results.append(read_json(summary_file)["email_info"])
         
         # Sort by processed date
         results.sort(key=lambda x: x.get("processed_date", ""), reverse=True)
-        return {"recent_results": results[:10]}
+        return {"recent_results": results}
         
     except Exception as e:
         return {"error": str(e), "recent_results": []}
@@ -427,15 +506,11 @@ async def get_email_details(message_id: str):
         if not message_dir:
             raise HTTPException(status_code=404, detail="Email not found")
         
-        summary_file = message_dir / "processing_summary.json"
-        if not summary_file.exists():
+        try:
+            return read_json(message_dir / "processing_summary.json")
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="Processing summary not found")
         
-        with open(summary_file) as f:
-            summary = json.load(f)
-        
-        return summary
-        
     except HTTPException:
         raise
     except Exception as e:
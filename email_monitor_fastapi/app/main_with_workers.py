@@ -9,6 +9,8 @@ monitoring service.
 
 import os
 import sys
+import json
+import time
 import asyncio
 import logging
 from contextlib import asynccontextmanager
@@ -19,12 +21,19 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 # Import the existing email monitor components
 from app.main import EmailMonitor, monitor, scheduler
+from app.result_files import latest_summary_files, read_json
 from worker_runner import FastAPIWorkerManager
 from fastapi import FastAPI, BackgroundTasks, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # Setup logging
 logger = logging.getLogger(__name__)
 
@@ -33,6 +42,11 @@ worker_manager = FastAPIWorkerManager(
     num_workers=int(os.getenv('MAX_CONCURRENT_WORKERS', '2'))
 )
 
+# Serialized /worker-stats body, reused for WORKER_STATS_TTL seconds so
+# frequent dashboard/load-balancer polling doesn't rebuild it every call
+WORKER_STATS_TTL = 0.5
+_worker_stats_cache = {"at": 0.0, "body": b""}
+
 @asynccontextmanager
 async def lifespan_with_workers(app):
     """
@@ -67,6 +81,10 @@ async def lifespan_with_workers(app):
         logger.info("Shutting down workers...")
         await worker_manager.shutdown()
         
+        # Release the async Redis connection pool
+        if monitor.redis_queue:
+            await monitor.redis_queue.aclose()
+        
         # Shutdown scheduler
         scheduler.shutdown(wait=False)
         logger.info("✅ Shutdown complete")
@@ -113,7 +131,7 @@ async def get_status():
     # Add Redis queue information if enabled
     if monitor.use_redis_queue and monitor.redis_queue:
         try:
-            queue_info = monitor.redis_queue.get_queue_info()
+            queue_info = await monitor.redis_queue.aget_queue_info()
             base_status["redis_queue"] = queue_info
         except Exception as e:
             base_status["redis_queue"] = {"error": str(e)}
@@ -147,17 +165,12 @@ async def get_recent_results():
     results = []
     
     try:
-        for message_dir in monitor.attachments_dir.iterdir():
-            if message_dir.is_dir():
-                summary_file = message_dir / "processing_summary.json"
-                if summary_file.exists():
-                    with open(summary_file) as f:
-                        summary = json.load(f)
-                        results.append(summary["email_info"])
+        for summary_file in latest_summary_files(monitor.attachments_dir, 10):
+            results.append(read_json(summary_file)["email_info"])
         
         # Sort by processed date
         results.sort(key=lambda x: x.get("processed_date", ""), reverse=True)
-        return {"recent_results": results[:10]}
+        return {"recent_results": results}
         
     except Exception as e:
         return {"error": str(e), "recent_results": []}
@@ -165,7 +178,6 @@ async def get_recent_results():
 @app.get("/email-details/{message_id}")
 async def get_email_details(message_id: str):
     """Get detailed information about a processed email"""
-    import json
     try:
         # Find the message directory
         message_dir = None
@@ -177,15 +189,11 @@ async def get_email_details(message_id: str):
         if not message_dir:
             raise HTTPException(status_code=404, detail="Email not found")
         
-        summary_file = message_dir / "processing_summary.json"
-        if not summary_file.exists():
+        try:
+            return read_json(message_dir / "processing_summary.json")
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="Processing summary not found")
         
-        with open(summary_file) as f:
-            summary = json.load(f)
-        
-        return summary
-        
     except HTTPException:
         raise
     except Exception as e:
@@ -203,7 +211,7 @@ async def get_redis_queue_status():
         return {"error": "Redis queue not initialized"}
     
     try:
-        return monitor.redis_queue.get_queue_info()
+        return await monitor.redis_queue.aget_queue_info()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -214,7 +222,7 @@ async def get_redis_queue_stats():
         raise HTTPException(status_code=400, detail="Redis queue not available")
     
     try:
-        return monitor.redis_queue.get_queue_stats()
+        return await asyncio.to_thread(monitor.redis_queue.get_queue_stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -229,7 +237,7 @@ async def peek_redis_queue(count: int = 5):
     
     try:
         return {
-            "queue_peek": monitor.redis_queue.peek_queue(count),
+            "queue_peek": await monitor.redis_queue.apeek_queue(count),
             "peek_count": count
         }
     except Exception as e:
@@ -242,7 +250,7 @@ async def clear_redis_queue():
         raise HTTPException(status_code=400, detail="Redis queue not available")
     
     try:
-        removed_count = monitor.redis_queue.clear_queue()
+        removed_count = await asyncio.to_thread(monitor.redis_queue.clear_queue)
         return {
             "message": f"Cleared {removed_count} items from queue",
             "removed_count": removed_count
@@ -255,7 +263,12 @@ async def clear_redis_queue():
 @app.get("/worker-stats")
 async def get_worker_stats():
     """Get attachment worker statistics"""
-    return worker_manager.get_stats()
+    now = time.monotonic()
+    if now - _worker_stats_cache["at"] > WORKER_STATS_TTL:
+        stats = worker_manager.get_stats()
+        _worker_stats_cache["body"] = orjson.dumps(stats) if HAS_ORJSON else json.dumps(stats).encode('utf-8')
+        _worker_stats_cache["at"] = now
+    return Response(content=_worker_stats_cache["body"], media_type="application/json")
 
 @app.get("/worker-health")
 async def get_worker_health():
@@ -268,6 +281,7 @@ async def restart_workers():
     try:
         await worker_manager.shutdown()
         await worker_manager.startup()
+        _worker_stats_cache["at"] = 0.0
         return {"message": "Workers restarted successfully"}
     except Exception as e:
         logger.error(f"Failed to restart workers: {e}")
@@ -292,7 +306,7 @@ async def get_system_overview():
     # Add Redis queue info if enabled
     if monitor.use_redis_queue and monitor.redis_queue:
         try:
-            queue_info = monitor.redis_queue.get_queue_info()
+            queue_info = await monitor.redis_queue.aget_queue_info()
             email_status["redis_queue"] = queue_info
         except Exception as e:
             email_status["redis_queue"] = {"error": str(e)}
@@ -7,21 +7,111 @@ import os
 import json
 import uuid
 import base64
+import threading
+import weakref
 from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from datetime import datetime
 import logging
 
 try:
     import redis
+    import redis.asyncio as aioredis
+    from redis.utils import HIREDIS_AVAILABLE
     HAS_REDIS = True
 except ImportError:
     HAS_REDIS = False
 
+try:
+    import pybase64
+    HAS_PYBASE64 = True
+except ImportError:
+    HAS_PYBASE64 = False
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import msgspec
+    HAS_MSGSPEC = True
+except ImportError:
+    HAS_MSGSPEC = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# SIMD base64 codec when available; same API and output as the stdlib
+b64encode = pybase64.b64encode if HAS_PYBASE64 else base64.b64encode
+b64decode = pybase64.b64decode if HAS_PYBASE64 else base64.b64decode
+
 logger = logging.getLogger(__name__)
 
+# Attachments larger than this are zstd-compressed before enqueue
+COMPRESSION_THRESHOLD = 64 * 1024
+ZSTD_LEVEL = 3
+
+# Atomic bounded push: KEYS[1] = queue, ARGV[1] = max length, ARGV[2..] = items.
+# Pushes items in order while the queue has room and returns how many were pushed.
+BOUNDED_LPUSH_SCRIPT = """
+local room = tonumber(ARGV[1]) - redis.call('LLEN', KEYS[1])
+local pushed = 0
+for i = 2, #ARGV do
+    if pushed >= room then
+        break
+    end
+    redis.call('LPUSH', KEYS[1], ARGV[i])
+    pushed = pushed + 1
+end
+return pushed
+"""
+
+# Connection pools whose server has no BLMPOP (Redis < 7.0), found on first use
+_no_blmpop_pools = weakref.WeakSet()
+
+# zstd contexts are reused but must not be shared between threads at once
+_zstd_local = threading.local()
+
 
-@dataclass
+def _zstd_compressor() -> 'zstandard.ZstdCompressor':
+    if not hasattr(_zstd_local, 'compressor'):
+        _zstd_local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return _zstd_local.compressor
+
+
+def _zstd_decompressor() -> 'zstandard.ZstdDecompressor':
+    if not hasattr(_zstd_local, 'decompressor'):
+        _zstd_local.decompressor = zstandard.ZstdDecompressor()
+    return _zstd_local.decompressor
+
+
+def compress_content(content: bytes):
+    """
+    Compress attachment bytes for the queue when they are large enough
+    
+    Returns:
+        (payload, compressed) - payload is the original bytes when not compressed
+    """
+    if HAS_ZSTD and len(content) > COMPRESSION_THRESHOLD:
+        return _zstd_compressor().compress(content), True
+    return content, False
+
+
+def decompress_content(payload: bytes, compressed: bool) -> bytes:
+    """Reverse compress_content"""
+    if not compressed:
+        return payload
+    if not HAS_ZSTD:
+        raise ImportError("Compressed queue item found. Install with: pip install zstandard")
+    return _zstd_decompressor().decompress(payload)
+
+
+@dataclass(slots=True, frozen=True)
 class EmailAttachmentData:
     """Data structure for email attachment queue items"""
     task_id: str
@@ -36,14 +126,11 @@ class EmailAttachmentData:
     attachment_content: bytes
     attachment_mime_type: str
     attachment_size: int
-    created_at: str = None
-    
-    def __post_init__(self):
-        if self.created_at is None:
-            self.created_at = datetime.now().isoformat()
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for Redis storage"""
+        content, compressed = compress_content(self.attachment_content)
         return {
             "task_id": self.task_id,
             "email_id": self.email_id,
@@ -54,7 +141,8 @@ class EmailAttachmentData:
             "email_received_date": self.email_received_date,
             "attachment_id": self.attachment_id,
             "attachment_filename": self.attachment_filename,
-            "attachment_content_b64": base64.b64encode(self.attachment_content).decode('utf-8'),
+            "attachment_content_b64": b64encode(content).decode('utf-8'),
+            "compressed": compressed,
             "attachment_mime_type": self.attachment_mime_type,
             "attachment_size": self.attachment_size,
             "created_at": self.created_at
@@ -62,9 +150,14 @@ class EmailAttachmentData:
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'EmailAttachmentData':
-        """Create from dictionary"""
-        # Convert base64 back to bytes
-        content_data = base64.b64decode(data['attachment_content_b64'].encode('utf-8'))
+        """Create from dictionary (to_dict output or a decoded MessagePack item)"""
+        if 'attachment_content' in data:
+            content_data = data['attachment_content']
+        else:
+            # Convert base64 back to bytes straight from the str; pybase64 decodes
+            # it without an encoded copy, the stdlib fallback still makes one
+            content_data = b64decode(data['attachment_content_b64'])
+        content_data = decompress_content(content_data, data.get('compressed', False))
         return cls(
             task_id=data['task_id'],
             email_id=data['email_id'],
@@ -78,8 +171,137 @@ class EmailAttachmentData:
             attachment_content=content_data,
             attachment_mime_type=data['attachment_mime_type'],
             attachment_size=data['attachment_size'],
-            created_at=data.get('created_at')
+            created_at=data.get('created_at') or datetime.now().isoformat()
+        )
+
+
+if HAS_MSGSPEC:
+    class _QueueItem(msgspec.Struct):
+        """Typed MessagePack schema for queue items"""
+        task_id: str
+        email_id: str
+        email_subject: str
+        email_sender: str
+        email_sender_email: str
+        email_content: str
+        email_received_date: str
+        attachment_id: str
+        attachment_filename: str
+        attachment_content: bytes
+        attachment_mime_type: str
+        attachment_size: int
+        created_at: Optional[str] = None
+        compressed: bool = False
+    
+    _msgpack_encoder = msgspec.msgpack.Encoder()
+    _msgpack_decoder = msgspec.msgpack.Decoder(_QueueItem)
+
+
+def encode_queue_item(attachment_data: EmailAttachmentData) -> bytes:
+    """
+    Serialize an attachment for the Redis queue
+    
+    Uses MessagePack (via msgspec) when available so the attachment bytes are
+    stored as a native binary field instead of base64 text inside JSON.
+    Attachments above COMPRESSION_THRESHOLD are zstd-compressed first.
+    """
+    if HAS_MSGSPEC:
+        fields = asdict(attachment_data)
+        fields['attachment_content'], fields['compressed'] = compress_content(fields['attachment_content'])
+        return _msgpack_encoder.encode(_QueueItem(**fields))
+    if HAS_ORJSON:
+        return orjson.dumps(attachment_data.to_dict())
+    return json.dumps(attachment_data.to_dict()).encode('utf-8')
+
+
+def decode_queue_item(raw_data) -> Dict[str, Any]:
+    """
+    Decode a raw Redis queue item into a field dictionary
+    
+    Accepts MessagePack items and JSON items (legacy, or written without msgspec).
+    The result can be passed to EmailAttachmentData.from_dict.
+    """
+    if isinstance(raw_data, str):
+        raw_data = raw_data.encode('utf-8')
+    if raw_data[:1] == b'{':
+        return orjson.loads(raw_data) if HAS_ORJSON else json.loads(raw_data)
+    if HAS_MSGSPEC:
+        return msgspec.msgpack.decode(raw_data)
+    raise ImportError("MessagePack queue item found. Install with: pip install msgspec")
+
+
+def parse_queue_item(raw_data) -> EmailAttachmentData:
+    """
+    Decode a raw Redis queue item straight into EmailAttachmentData
+    
+    MessagePack items are decoded and type-checked against the _QueueItem
+    schema by msgspec, skipping the intermediate field
+    dictionary; everything else goes through decode_queue_item/from_dict.
+    """
+    if HAS_MSGSPEC and isinstance(raw_data, bytes) and raw_data[:1] != b'{':
+        item = _msgpack_decoder.decode(raw_data)
+        return EmailAttachmentData(
+            task_id=item.task_id,
+            email_id=item.email_id,
+            email_subject=item.email_subject,
+            email_sender=item.email_sender,
+            email_sender_email=item.email_sender_email,
+            email_content=item.email_content,
+            email_received_date=item.email_received_date,
+            attachment_id=item.attachment_id,
+            attachment_filename=item.attachment_filename,
+            attachment_content=decompress_content(item.attachment_content, item.compressed),
+            attachment_mime_type=item.attachment_mime_type,
+            attachment_size=item.attachment_size,
+            created_at=item.created_at or datetime.now().isoformat()
         )
+    return EmailAttachmentData.from_dict(decode_queue_item(raw_data))
+
+
+def pop_queue_batch(redis_client, queue_name: str, count: int, timeout: int) -> List[bytes]:
+    """
+    Block until items are available, then pop up to count of them in one call
+    
+    Uses BLMPOP (Redis 7.0+), popping from the right so LPUSH order stays FIFO.
+    On older servers the first call finds BLMPOP missing, which is remembered
+    per connection pool so later calls go straight to a single BRPOP.
+    
+    Returns:
+        List of raw queue items, oldest first (empty on timeout)
+    """
+    pool = redis_client.connection_pool
+    if pool not in _no_blmpop_pools:
+        try:
+            reply = redis_client.execute_command("BLMPOP", timeout, 1, queue_name, "RIGHT", "COUNT", count)
+        except redis.exceptions.ResponseError as e:
+            if 'unknown command' not in str(e).lower():
+                raise
+            logger.info("Redis server has no BLMPOP (needs 7.0+), popping one item at a time")
+            _no_blmpop_pools.add(pool)
+        else:
+            # BLMPOP replies with [queue_name, [item, ...]]
+            return list(reply[1]) if reply else []
+    
+    reply = redis_client.brpop(queue_name, timeout=timeout)
+    return [reply[1]] if reply else []
+
+
+async def apop_queue_batch(redis_client, queue_name: str, count: int, timeout: int) -> List[bytes]:
+    """Async version of pop_queue_batch, for redis.asyncio clients"""
+    pool = redis_client.connection_pool
+    if pool not in _no_blmpop_pools:
+        try:
+            reply = await redis_client.execute_command("BLMPOP", timeout, 1, queue_name, "RIGHT", "COUNT", count)
+        except redis.exceptions.ResponseError as e:
+            if 'unknown command' not in str(e).lower():
+                raise
+            logger.info("Redis server has no BLMPOP (needs 7.0+), popping one item at a time")
+            _no_blmpop_pools.add(pool)
+        else:
+            return list(reply[1]) if reply else []
+    
+    reply = await redis_client.brpop(queue_name, timeout=timeout)
+    return [reply[1]] if reply else []
 
 
 class RedisEmailQueue:
@@ -100,6 +322,10 @@ class RedisEmailQueue:
         self.max_queue_size = int(os.getenv('MAX_QUEUE_SIZE', 1000))
         self.max_attachment_size = int(os.getenv('MAX_ATTACHMENT_SIZE', 50 * 1024 * 1024))  # 50MB
         
+        # Async client for event-loop callers, created on first use (see aconnect)
+        self.aredis = None
+        self._abounded_lpush = None
+        
         # Initialize Redis connection
         try:
             self.redis_client = redis.Redis(
@@ -116,7 +342,11 @@ class RedisEmailQueue:
             
             # Test connection
             self.redis_client.ping()
+            self._bounded_lpush = self.redis_client.register_script(BOUNDED_LPUSH_SCRIPT)
             logger.info(f"Redis connected: {self.redis_host}:{self.redis_port}/{self.redis_db}")
+            if not HIREDIS_AVAILABLE:
+                logger.warning("hiredis not installed; redis-py is using its pure-Python reply parser. "
+                               "Install with: pip install 'redis[hiredis]'")
             
         except Exception as e:
             logger.error(f"Failed to connect to Redis: {e}")
@@ -138,18 +368,16 @@ class RedisEmailQueue:
                 logger.warning(f"Attachment {attachment_data.attachment_filename} too large: {attachment_data.attachment_size} bytes")
                 return False
             
-            # Check queue size limit
-            current_size = self.redis_client.llen(self.queue_name)
-            if current_size >= self.max_queue_size:
-                logger.warning(f"Queue {self.queue_name} is full: {current_size} items")
+            # Check the queue size limit and push in one atomic script call,
+            # so concurrent producers can't both pass the check (LPUSH for FIFO with RPOP)
+            pushed = self._bounded_lpush(
+                keys=[self.queue_name],
+                args=[self.max_queue_size, encode_queue_item(attachment_data)]
+            )
+            if not pushed:
+                logger.warning(f"Queue {self.queue_name} is full: {self.max_queue_size} items")
                 return False
             
-            # Convert to JSON string
-            json_data = json.dumps(attachment_data.to_dict())
-            
-            # Push to Redis queue (LPUSH for FIFO with RPOP)
-            self.redis_client.lpush(self.queue_name, json_data)
-            
             logger.info(f"Enqueued attachment: {attachment_data.attachment_filename} from email {attachment_data.email_subject[:50]}")
             return True
             
@@ -157,75 +385,122 @@ class RedisEmailQueue:
             logger.error(f"Failed to enqueue attachment {attachment_data.attachment_filename}: {e}")
             return False
     
-    def enqueue_multiple_attachments(self, attachments: List[EmailAttachmentData]) -> int:
+    def enqueue_attachments(self, attachments: List[EmailAttachmentData]) -> List[bool]:
         """
-        Enqueue multiple attachments in batch
+        Enqueue several attachments with one atomic script call
+        
+        Sizes are validated up front; the script then pushes only as many
+        items as the queue has room for, so concurrent producers can't
+        overfill it.
         
         Args:
             attachments: List of EmailAttachmentData objects
             
         Returns:
-            int: Number of successfully enqueued attachments
+            List of booleans, one per attachment, True if it was enqueued
         """
-        enqueued_count = 0
+        results = [False] * len(attachments)
         
         try:
-            # Use pipeline for better performance
-            pipe = self.redis_client.pipeline()
-            valid_attachments = []
-            
-            for attachment in attachments:
-                # Validate attachment
-                if attachment.attachment_size <= self.max_attachment_size:
-                    json_data = json.dumps(attachment.to_dict())
-                    pipe.lpush(self.queue_name, json_data)
-                    valid_attachments.append(attachment)
-                else:
+            valid = []
+            for index, attachment in enumerate(attachments):
+                if attachment.attachment_size > self.max_attachment_size:
                     logger.warning(f"Skipping large attachment: {attachment.attachment_filename}")
+                else:
+                    valid.append(index)
+            
+            if not valid:
+                return results
+            
+            # The script pushes a prefix of the items, as many as fit under the limit
+            pushed = self._bounded_lpush(
+                keys=[self.queue_name],
+                args=[self.max_queue_size, *(encode_queue_item(attachments[index]) for index in valid)]
+            )
+            if pushed < len(valid):
+                logger.warning(f"Queue {self.queue_name} had room for {pushed} of {len(valid)} attachments")
+            
+            for index in valid[:pushed]:
+                results[index] = True
+            
+            logger.info(f"Batch enqueued {sum(results)} attachments from {len(attachments)} total")
             
-            # Check if we would exceed queue size
-            current_size = self.redis_client.llen(self.queue_name)
-            if current_size + len(valid_attachments) > self.max_queue_size:
-                logger.warning(f"Batch would exceed queue limit, enqueuing individually")
-                # Fallback to individual enqueuing
-                for attachment in valid_attachments:
-                    if self.enqueue_attachment(attachment):
-                        enqueued_count += 1
-            else:
-                # Execute pipeline
-                results = pipe.execute()
-                enqueued_count = len([r for r in results if r])
-                
-                logger.info(f"Batch enqueued {enqueued_count} attachments from {len(attachments)} total")
-        
         except Exception as e:
             logger.error(f"Failed to batch enqueue attachments: {e}")
-            # Fallback to individual enqueuing
-            for attachment in attachments:
-                if self.enqueue_attachment(attachment):
-                    enqueued_count += 1
         
-        return enqueued_count
+        return results
+    
+    def enqueue_multiple_attachments(self, attachments: List[EmailAttachmentData]) -> int:
+        """
+        Enqueue multiple attachments in batch
+        
+        Args:
+            attachments: List of EmailAttachmentData objects
+            
+        Returns:
+            int: Number of successfully enqueued attachments
+        """
+        return sum(self.enqueue_attachments(attachments))
+    
+    def dequeue_batch(self, count: int = 32, timeout: int = 5) -> List[EmailAttachmentData]:
+        """
+        Pop up to count attachments in a single round trip
+        
+        Args:
+            count: Maximum number of items to pop
+            timeout: Seconds to block waiting for the first item
+            
+        Returns:
+            List of EmailAttachmentData, oldest first (unparseable items are skipped)
+        """
+        attachments = []
+        for item in pop_queue_batch(self.redis_client, self.queue_name, count, timeout):
+            try:
+                attachments.append(parse_queue_item(item))
+            except Exception as parse_error:
+                logger.warning(f"Failed to parse dequeued item: {parse_error}")
+        return attachments
+    
+    def _queue_info(self, info: Any, queue_length: Any) -> Dict[str, Any]:
+        """
+        Build the queue info response from INFO and LLEN replies
+        
+        The replies come from a pipeline run with raise_on_error=False, so
+        either may be an exception. A failed INFO (servers or proxies that
+        restrict it) only drops the Redis details; a failed LLEN is raised.
+        """
+        if isinstance(queue_length, Exception):
+            raise queue_length
+        
+        if isinstance(info, Exception):
+            logger.warning(f"Redis INFO unavailable: {info}")
+            redis_info = {"error": str(info)}
+        else:
+            redis_info = {
+                "redis_version": info.get('redis_version'),
+                "used_memory": info.get('used_memory'),
+                "used_memory_human": info.get('used_memory_human'),
+                "connected_clients": info.get('connected_clients'),
+                "total_commands_processed": info.get('total_commands_processed')
+            }
+        
+        return {
+            "queue_name": self.queue_name,
+            "queue_length": queue_length,
+            "max_queue_size": self.max_queue_size,
+            "max_attachment_size": self.max_attachment_size,
+            "redis_info": redis_info
+        }
     
     def get_queue_info(self) -> Dict[str, Any]:
         """Get information about the queue"""
         try:
-            info = self.redis_client.info()
-            queue_length = self.redis_client.llen(self.queue_name)
-            
-            return {
-                "queue_name": self.queue_name,
-                "queue_length": queue_length,
-                "max_queue_size": self.max_queue_size,
-                "max_attachment_size": self.max_attachment_size,
-                "redis_info": {
-                    "redis_version": info.get('redis_version'),
-                    "used_memory": info.get('used_memory'),
-                    "used_memory_human": info.get('used_memory_human'),
-                    "connected_clients": info.get('connected_clients'),
-                    "total_commands_processed": info.get('total_commands_processed')
-                }
-            }
+            # One round trip for both replies, each checked on its own
+            with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.info()
+                pipe.llen(self.queue_name)
+                info, queue_length = pipe.execute(raise_on_error=False)
+            return self._queue_info(info, queue_length)
         except Exception as e:
             logger.error(f"Failed to get queue info: {e}")
             return {
@@ -233,6 +508,27 @@ class RedisEmailQueue:
                 "error": str(e)
             }
     
+    def _preview_items(self, items: List[bytes]) -> List[Dict[str, Any]]:
+        """Decode LRANGE items for display, oldest first, without their content"""
+        result = []
+        for item in reversed(items):  # Reverse to show oldest first
+            try:
+                data = decode_queue_item(item)
+                # Remove large content for preview
+                preview_data = data.copy()
+                if 'attachment_content' in preview_data:
+                    content_size = len(preview_data['attachment_content'])
+                    preview_data['attachment_content'] = f"<{content_size} bytes>"
+                if 'attachment_content_b64' in preview_data:
+                    content_size = len(preview_data['attachment_content_b64'])
+                    preview_data['attachment_content_b64'] = f"<{content_size} characters>"
+                result.append(preview_data)
+            except Exception as parse_error:
+                logger.warning(f"Failed to parse queue item: {parse_error}")
+                result.append({"error": "Failed to parse item"})
+        
+        return result
+    
     def peek_queue(self, count: int = 5) -> List[Dict[str, Any]]:
         """
         Peek at items in the queue without removing them
@@ -246,23 +542,84 @@ class RedisEmailQueue:
         try:
             # Get items from the end of the list (oldest items)
             items = self.redis_client.lrange(self.queue_name, -count, -1)
+            return self._preview_items(items)
             
-            result = []
-            for item in reversed(items):  # Reverse to show oldest first
-                try:
-                    data = json.loads(item.decode('utf-8') if isinstance(item, bytes) else item)
-                    # Remove large content for preview
-                    preview_data = data.copy()
-                    if 'attachment_content_b64' in preview_data:
-                        content_size = len(preview_data['attachment_content_b64'])
-                        preview_data['attachment_content_b64'] = f"<{content_size} characters>"
-                    result.append(preview_data)
-                except Exception as parse_error:
-                    logger.warning(f"Failed to parse queue item: {parse_error}")
-                    result.append({"error": "Failed to parse item"})
+        except Exception as e:
+            logger.error(f"Failed to peek queue: {e}")
+            return []
+    
+    # === Async API for use inside the event loop ===
+    
+    def aconnect(self) -> 'aioredis.Redis':
+        """Return the shared async Redis client, creating it on first use"""
+        if self.aredis is None:
+            # One client, and so one connection pool, shared by all async callers
+            self.aredis = aioredis.Redis(
+                host=self.redis_host,
+                port=self.redis_port,
+                db=self.redis_db,
+                password=self.redis_password,
+                decode_responses=False,
+                socket_timeout=5,
+                socket_connect_timeout=5,
+                retry_on_timeout=True,
+                health_check_interval=30
+            )
+        if self._abounded_lpush is None:
+            # Registered once against the client in use, like the sync script in __init__
+            self._abounded_lpush = self.aredis.register_script(BOUNDED_LPUSH_SCRIPT)
+        return self.aredis
+    
+    async def aclose(self):
+        """Close the async client's connection pool, if one was opened"""
+        if self.aredis is not None:
+            await self.aredis.close()
+            self.aredis = None
+            self._abounded_lpush = None
+    
+    async def aenqueue_attachment(self, attachment_data: EmailAttachmentData) -> bool:
+        """Async version of enqueue_attachment"""
+        try:
+            if attachment_data.attachment_size > self.max_attachment_size:
+                logger.warning(f"Attachment {attachment_data.attachment_filename} too large: {attachment_data.attachment_size} bytes")
+                return False
             
-            return result
+            self.aconnect()
+            pushed = await self._abounded_lpush(
+                keys=[self.queue_name],
+                args=[self.max_queue_size, encode_queue_item(attachment_data)]
+            )
+            if not pushed:
+                logger.warning(f"Queue {self.queue_name} is full: {self.max_queue_size} items")
+                return False
             
+            logger.info(f"Enqueued attachment: {attachment_data.attachment_filename} from email {attachment_data.email_subject[:50]}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to enqueue attachment {attachment_data.attachment_filename}: {e}")
+            return False
+    
+    async def aget_queue_info(self) -> Dict[str, Any]:
+        """Async version of get_queue_info"""
+        try:
+            async with self.aconnect().pipeline(transaction=False) as pipe:
+                pipe.info()
+                pipe.llen(self.queue_name)
+                info, queue_length = await pipe.execute(raise_on_error=False)
+            return self._queue_info(info, queue_length)
+        except Exception as e:
+            logger.error(f"Failed to get queue info: {e}")
+            return {
+                "queue_name": self.queue_name,
+                "error": str(e)
+            }
+    
+    async def apeek_queue(self, count: int = 5) -> List[Dict[str, Any]]:
+        """Async version of peek_queue"""
+        try:
+            items = await self.aconnect().lrange(self.queue_name, -count, -1)
+            return self._preview_items(items)
         except Exception as e:
             logger.error(f"Failed to peek queue: {e}")
             return []
@@ -299,7 +656,7 @@ class RedisEmailQueue:
             
             for item in items:
                 try:
-                    data = json.loads(item.decode('utf-8') if isinstance(item, bytes) else item)
+                    data = decode_queue_item(item)
                     if data.get('task_id') == task_id:
                         return EmailAttachmentData.from_dict(data)
                 except Exception as parse_error:
@@ -360,7 +717,7 @@ class RedisEmailQueue:
             
             for item in sample_items:
                 try:
-                    data = json.loads(item.decode('utf-8') if isinstance(item, bytes) else item)
+                    data = decode_queue_item(item)
                     size = data.get('attachment_size', 0)
                     total_sample_size += size
                     
@@ -0,0 +1,56 @@
+"""
+Processing Result Files
+Helpers shared by the dashboard apps for reading saved summaries and results.
+"""
+
+import os
+import json
+import heapq
+from pathlib import Path
+from typing import Any, List
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def read_json(path: Path) -> Any:
+    """Load a JSON file, using orjson when it is installed"""
+    if HAS_ORJSON:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def latest_summary_files(attachments_dir: Path, limit: int, include_legacy: bool = False) -> List[Path]:
+    """
+    Return the `limit` most recently written processing summaries, newest first
+    
+    Selection is by file mtime so only the returned summaries need to be read.
+    This assumes a summary's mtime tracks its processed_date, which holds
+    because each summary is written once when its email is processed; copied
+    or restored directories that don't keep their mtimes can pick a different
+    set than a full sort on processed_date would.
+    
+    Args:
+        attachments_dir: Directory holding one subdirectory per message
+        limit: Maximum number of summaries to return
+        include_legacy: Also consider root-level *_processing_summary_*.json files
+    """
+    candidates = []
+    with os.scandir(attachments_dir) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                summary_path = os.path.join(entry.path, "processing_summary.json")
+                try:
+                    candidates.append((os.stat(summary_path).st_mtime, summary_path))
+                except FileNotFoundError:
+                    continue
+            elif (include_legacy and entry.is_file()
+                  and "_processing_summary_" in entry.name and entry.name.endswith(".json")):
+                candidates.append((entry.stat().st_mtime, entry.path))
+    
+    return [Path(path) for _, path in heapq.nlargest(limit, candidates)]
@@ -25,14 +25,21 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 try:
     import redis
+    import redis.asyncio as aioredis
     HAS_REDIS = True
 except ImportError:
     HAS_REDIS = False
     print("Redis not available. Install with: pip install redis")
     sys.exit(1)
 
+try:
+    import uvloop
+    HAS_UVLOOP = True
+except ImportError:
+    HAS_UVLOOP = False
+
 # Import from the app
-from app.redis_queue import RedisEmailQueue, EmailAttachmentData
+from app.redis_queue import RedisEmailQueue, EmailAttachmentData, parse_queue_item, pop_queue_batch, apop_queue_batch
 
 # Placeholder imports for your pipeline - replace with your actual imports
 # from your_pipeline import Runner, types, main_pipeline_agent, InMemorySessionService, InMemoryArtifactService
@@ -50,6 +57,59 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Process-wide connection pool, created on first use
+_pool: Optional[redis.ConnectionPool] = None
+
+
+def _connection_settings() -> Dict[str, Any]:
+    """Redis connection settings from REDIS_* variables, shared by sync and async clients"""
+    return dict(
+        host=os.getenv('REDIS_HOST', 'localhost'),
+        port=int(os.getenv('REDIS_PORT', 6379)),
+        db=int(os.getenv('REDIS_DB', 0)),
+        password=os.getenv('REDIS_PASSWORD'),
+        max_connections=int(os.getenv('REDIS_MAX_CONNECTIONS', '32')),
+        decode_responses=False,
+        socket_timeout=5,
+        socket_connect_timeout=5,
+        socket_keepalive=True,
+        retry_on_timeout=True,
+        health_check_interval=30
+    )
+
+
+def get_connection_pool() -> redis.ConnectionPool:
+    """Return the process-wide Redis connection pool, configured from REDIS_* variables"""
+    global _pool
+    if _pool is None:
+        _pool = redis.ConnectionPool(**_connection_settings())
+    return _pool
+
+
+def install_event_loop_policy():
+    """
+    Pin the event loop used by asyncio.run in worker entrypoints
+    
+    Proactor on Windows (needed for subprocess I/O, and guards against a
+    library having switched the policy to Selector); uvloop elsewhere when
+    it is installed.
+    """
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+    elif HAS_UVLOOP:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+def create_redis_client() -> redis.Redis:
+    """Create a Redis client backed by the shared connection pool"""
+    return redis.Redis(connection_pool=get_connection_pool())
+
+
+def create_async_redis_client() -> 'aioredis.Redis':
+    """Create a redis.asyncio client (with its own pool) for workers sharing an event loop"""
+    return aioredis.Redis(**_connection_settings())
+
+
 class AttachmentWorker:
     """
     Worker that consumes email attachments from Redis queue and processes them
@@ -57,24 +117,44 @@ class AttachmentWorker:
     with the email text content.
     """
     
-    def __init__(self):
-        """Initialize the worker with configuration"""
+    def __init__(self, redis_client: Optional[redis.Redis] = None, worker_id: Optional[str] = None,
+                 shared_counters: Optional[Dict[str, Any]] = None, max_tasks: Optional[int] = None):
+        """
+        Initialize the worker with configuration
+        
+        Args:
+            redis_client: Client to share with other workers, sync or redis.asyncio
+                (a new sync one is created if omitted)
+            worker_id: Worker identity, defaults to PIPELINE_USER_ID
+            shared_counters: multiprocessing.Value counters, keyed like self.stats,
+                that the worker manager reads without IPC
+            max_tasks: Exit after this many items (0 = never), defaults to
+                WORKER_MAX_TASKS; only worker processes are recycled
+        """
         # Redis configuration
-        self.redis_client = self._init_redis()
+        self.redis_client = redis_client or self._init_redis()
+        self._async_redis = isinstance(self.redis_client, aioredis.Redis)
         self.queue_name = os.getenv('EMAIL_QUEUE_NAME', 'email_attachments')
         
         # Pipeline configuration
         self.app_name = os.getenv('PIPELINE_APP_NAME', 'EMAIL_PROCESSOR')
-        self.user_id = os.getenv('PIPELINE_USER_ID', 'worker_001')
+        self.user_id = worker_id or os.getenv('PIPELINE_USER_ID', 'worker_001')
         self.max_retries = int(os.getenv('MAX_PIPELINE_RETRIES', '3'))
+        # Identity stamped on every result, built once rather than per attachment
+        self.worker_id = f"{self.user_id}_{os.getpid()}"
         
         # Worker configuration  
         self.poll_interval = int(os.getenv('WORKER_POLL_INTERVAL', '5'))  # seconds
+        # Items per Redis pop; popped items are lost if the worker dies or is
+        # recycled mid-batch (there is no ack), so keep this small
+        self.batch_size = int(os.getenv('WORKER_BATCH_SIZE', '4'))
+        self.max_tasks = int(os.getenv('WORKER_MAX_TASKS', '0')) if max_tasks is None else max_tasks
         self.processing_timeout = int(os.getenv('PROCESSING_TIMEOUT', '300'))  # 5 minutes
         self.temp_dir = Path(os.getenv('WORKER_TEMP_DIR', '/tmp/attachment_worker'))
         self.temp_dir.mkdir(exist_ok=True)
         
         # Statistics
+        self.shared_counters = shared_counters or {}
         self.stats = {
             'processed_count': 0,
             'success_count': 0,
@@ -90,17 +170,7 @@ class AttachmentWorker:
     def _init_redis(self) -> redis.Redis:
         """Initialize Redis connection"""
         try:
-            redis_client = redis.Redis(
-                host=os.getenv('REDIS_HOST', 'localhost'),
-                port=int(os.getenv('REDIS_PORT', 6379)),
-                db=int(os.getenv('REDIS_DB', 0)),
-                password=os.getenv('REDIS_PASSWORD'),
-                decode_responses=False,
-                socket_timeout=5,
-                socket_connect_timeout=5,
-                retry_on_timeout=True,
-                health_check_interval=30
-            )
+            redis_client = create_redis_client()
             
             # Test connection
             redis_client.ping()
@@ -117,36 +187,31 @@ class AttachmentWorker:
         
         while True:
             try:
-                # Get next item from queue (blocking with timeout)
-                queue_item = self.redis_client.brpop(self.queue_name, timeout=self.poll_interval)
+                # Get up to batch_size items in one round trip (blocking with timeout).
+                # An async client waits on the loop; a sync client waits in a thread
+                # so workers sharing a loop don't stall each other
+                if self._async_redis:
+                    raw_items = await apop_queue_batch(
+                        self.redis_client, self.queue_name, self.batch_size, self.poll_interval
+                    )
+                else:
+                    raw_items = await asyncio.to_thread(
+                        pop_queue_batch, self.redis_client, self.queue_name, self.batch_size, self.poll_interval
+                    )
                 
-                if queue_item is None:
+                if not raw_items:
                     # No items in queue, continue polling
                     logger.debug("No items in queue, continuing...")
                     continue
                 
-                # Extract the actual data (brpop returns tuple: (queue_name, data))
-                _, raw_data = queue_item
+                # Process the batch concurrently
+                await asyncio.gather(*(self._handle_queue_item(raw_data) for raw_data in raw_items))
                 
-                # Parse the attachment data
-                try:
-                    attachment_data = self._parse_queue_item(raw_data)
-                    if attachment_data is None:
-                        continue
-                        
-                    logger.info(f"Processing attachment: {attachment_data.attachment_filename} "
-                               f"from email: {attachment_data.email_subject[:50]}")
-                    
-                    # Process the attachment
-                    success = await self._process_attachment(attachment_data)
-                    
-                    # Update statistics
-                    self._update_stats(success)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing queue item: {e}")
-                    logger.error(traceback.format_exc())
-                    self.stats['error_count'] += 1
+                # Recycle the worker so the manager replaces it with a fresh
+                # process, bounding memory leaked by pipeline libraries
+                if self.max_tasks and self.stats['processed_count'] >= self.max_tasks:
+                    logger.info(f"Processed {self.stats['processed_count']} items, exiting for recycle")
+                    break
                     
             except KeyboardInterrupt:
                 logger.info("Worker shutdown requested")
@@ -159,16 +224,34 @@ class AttachmentWorker:
         
         logger.info("Attachment worker stopped")
     
+    async def _handle_queue_item(self, raw_data: bytes):
+        """Parse and process one raw queue item, recording the outcome"""
+        try:
+            # Decoding (and any decompression) runs on a thread to keep the loop free
+            attachment_data = await asyncio.to_thread(self._parse_queue_item, raw_data)
+            if attachment_data is None:
+                return
+                
+            logger.info(f"Processing attachment: {attachment_data.attachment_filename} "
+                       f"from email: {attachment_data.email_subject[:50]}")
+            
+            # Process the attachment
+            success = await self._process_attachment(attachment_data)
+            
+            # Update statistics
+            self._update_stats(success)
+            
+        except Exception as e:
+            logger.error(f"Error processing queue item: {e}")
+            logger.error(traceback.format_exc())
+            self.stats['error_count'] += 1
+            self._bump_shared('error_count')
+    
     def _parse_queue_item(self, raw_data: bytes) -> Optional[EmailAttachmentData]:
         """Parse raw queue data into EmailAttachmentData object"""
         try:
-            # Decode JSON data
-            json_str = raw_data.decode('utf-8') if isinstance(raw_data, bytes) else raw_data
-            data_dict = json.loads(json_str)
-            
-            # Create EmailAttachmentData object
-            attachment_data = EmailAttachmentData.from_dict(data_dict)
-            return attachment_data
+            # Decode MessagePack (or legacy JSON) data
+            return parse_queue_item(raw_data)
             
         except Exception as e:
             logger.error(f"Failed to parse queue item: {e}")
@@ -224,7 +307,7 @@ class AttachmentWorker:
             temp_file = self.temp_dir / f"{attachment_data.task_id}_{uuid.uuid4().hex[:8]}{file_ext}"
             
             # Write attachment content to file
-            temp_file.write_bytes(attachment_data.attachment_content)
+            self._write_buffer(temp_file, attachment_data.attachment_content)
             
             logger.debug(f"Saved attachment to temp file: {temp_file}")
             return temp_file
@@ -233,6 +316,24 @@ class AttachmentWorker:
             logger.error(f"Failed to save temp attachment: {e}")
             return None
     
+    @staticmethod
+    def _write_buffer(path: Path, content: bytes):
+        """
+        Write content straight from its buffer with a raw fd
+        
+        Skips the buffered file object; the file gets the same default mode
+        (0o666 & ~umask) that open() would give it.
+        """
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+        fd = os.open(str(path), flags, 0o666)
+        try:
+            view = memoryview(content)
+            while view:
+                # os.write may be partial for large buffers; slicing a memoryview doesn't copy
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+    
     async def _run_pipeline(self, attachment_data: EmailAttachmentData, attachment_path: Path) -> Dict[str, Any]:
         """
         Run the AI pipeline for processing the attachment
@@ -312,8 +413,9 @@ class AttachmentWorker:
         data to your pipeline, along with MIME type information.
         """
         
-        # Read attachment content for pipeline
-        attachment_bytes = attachment_path.read_bytes()
+        # The content is already in memory (it was just written to attachment_path),
+        # so hand the pipeline that buffer instead of reading the file back
+        attachment_bytes = attachment_data.attachment_content
         
         # Prepare the input structure
         pipeline_input = {
@@ -340,7 +442,7 @@ class AttachmentWorker:
             
             # Processing metadata
             "processing": {
-                "worker_id": f"{self.user_id}_{os.getpid()}",
+                "worker_id": self.worker_id,
                 "started_at": datetime.now().isoformat(),
                 "app_name": self.app_name
             }
@@ -454,7 +556,7 @@ class AttachmentWorker:
                 "processing_result": result,
                 "processed_at": datetime.now().isoformat(),
                 "worker_info": {
-                    "worker_id": f"{self.user_id}_{os.getpid()}",
+                    "worker_id": self.worker_id,
                     "app_name": self.app_name
                 }
             }
@@ -472,16 +574,26 @@ class AttachmentWorker:
         """Update worker statistics"""
         self.stats['processed_count'] += 1
         self.stats['last_processed_at'] = datetime.now().isoformat()
+        self._bump_shared('processed_count')
         
         if success:
             self.stats['success_count'] += 1
+            self._bump_shared('success_count')
         else:
             self.stats['error_count'] += 1
+            self._bump_shared('error_count')
         
         # Log stats every 10 processed items
         if self.stats['processed_count'] % 10 == 0:
             self._log_stats()
     
+    def _bump_shared(self, name: str):
+        """Increment a counter shared with the worker manager, if one was given"""
+        counter = self.shared_counters.get(name)
+        if counter is not None:
+            with counter.get_lock():
+                counter.value += 1
+    
     def _log_stats(self):
         """Log current worker statistics"""
         logger.info("=== Worker Statistics ===")
@@ -502,13 +614,13 @@ class AttachmentWorker:
         return self.stats.copy()
 
 
-async def main():
+async def main(shared_counters: Optional[Dict[str, Any]] = None):
     """Main entry point for the worker"""
     logger.info("Starting Email Attachment Worker")
     
     try:
         # Create and run the worker
-        worker = AttachmentWorker()
+        worker = AttachmentWorker(shared_counters=shared_counters)
         await worker.run()
         
     except KeyboardInterrupt:
@@ -521,4 +633,5 @@ async def main():
 
 if __name__ == "__main__":
     # Run the worker
+    install_event_loop_policy()
     asyncio.run(main())
\ No newline at end of file
@@ -91,7 +91,7 @@ To use this email monitoring system:
    # Run full stress tests:
    python3 test_stress_local.py
 
-2. WITHOUT DEPENDENCIES (Standard library only):
+2. MINIMAL DEPENDENCIES (standard library plus httpx):
    # Run simplified stress tests:
    python3 simple_stress_test.py
 
@@ -128,7 +128,7 @@ This demo shows a complete local testing setup for the email_monitor_fastapi ser
 • Mock email server that simulates Microsoft Graph API
 • Local version of the email monitoring service  
 • Comprehensive stress tests using unittest
-• No external dependencies required for basic testing
+• Only httpx required beyond the standard library for basic testing
     """)
     
     # Show file structure
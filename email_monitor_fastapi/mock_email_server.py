@@ -1,33 +1,74 @@
 """
 Mock Email Server for Local Testing
 Simulates Microsoft Graph API responses without requiring real Azure credentials
+
+Tests hitting the mock should reuse one keep-alive client rather than opening
+a new connection per request: use MockEmailServer.get_test_client() for a
+pooled requests.Session, or get_async_test_client() for an httpx.AsyncClient.
 """
 
+import os
 import json
 import time
 import uuid
-import base64
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
-from pathlib import Path
 import threading
 import random
-from flask import Flask, jsonify, request, send_file
-import io
+import itertools
+import socket
+import argparse
+import multiprocessing
+import tempfile
+import shutil
+import atexit
+import urllib.error
+import urllib.request
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Number of canned delta responses kept in each round-robin ring
+DELTA_RESPONSE_VARIANTS = 16
+
+def _json_dumps(obj: Any) -> bytes:
+    """Serialize to JSON bytes, using orjson when it is installed"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
 
 class MockEmailServer:
     """Mock server that simulates Microsoft Graph API responses"""
     
-    def __init__(self, port: int = 5001):
+    def __init__(self, port: int = 5001, generate_on_init: bool = True):
         self.port = port
-        self.app = Flask(__name__)
+        self._delta_link_prefix = f"http://localhost:{port}/v1.0/me/messages/delta?$deltatoken="
+        self.app = None  # Flask app, created on first start
         self.messages = []
+        self._by_id: Dict[str, Dict[str, Any]] = {}
         self.delta_tokens = {}
         self.attachment_data = {}
+        self._attachment_paths: Dict[str, str] = {}
+        self._blob_paths: Dict[bytes, str] = {}
+        self._blob_dir: Optional[str] = None
+        self._attachments_response: Dict[str, bytes] = {}
+        self._health_timestamp = datetime.now().isoformat()
+        self._health_timestamp_at = time.monotonic()
+        self._ready = threading.Event()
         
         # Generate dummy messages with attachments
+        if generate_on_init:
+            self.prepare()
+    
+    def prepare(self):
+        """Generate the dummy dataset and canned responses if not done yet"""
+        if self.messages:
+            return
         self._generate_dummy_messages()
-        self._setup_routes()
+        self._build_delta_responses()
         
     def _generate_dummy_messages(self):
         """Generate realistic dummy email messages with attachments"""
@@ -52,18 +93,34 @@ class MockEmailServer:
         # Generate dummy Excel-like content (simple CSV)
         sample_excel = b'Name,Value,Date\nTest Item 1,100,2024-01-01\nTest Item 2,200,2024-01-02\nTest Item 3,300,2024-01-03'
         
+        # Draw all random choices and ids up front rather than per iteration
+        num_messages = 20
+        message_senders = random.choices(senders, k=num_messages)
+        message_subjects = random.choices(subjects, k=num_messages)
+        attachment_counts = random.choices(range(1, 4), k=num_messages)
+        received_offsets = random.choices(range(1, 1441), k=num_messages)
+        
+        raw = os.urandom(16 * (num_messages + sum(attachment_counts)))
+        ids = [
+            str(uuid.UUID(bytes=raw[k:k + 16], version=4))
+            for k in range(0, len(raw), 16)
+        ]
+        id_iter = iter(ids)
+        
+        base_now = datetime.now()
+        base_date_str = base_now.strftime('%Y-%m-%d')
+        
         # Generate messages
-        for i in range(20):
-            message_id = str(uuid.uuid4())
-            sender = random.choice(senders)
-            subject = f"{random.choice(subjects)} - {datetime.now().strftime('%Y-%m-%d')}"
+        for i in range(num_messages):
+            message_id = next(id_iter)
+            sender = message_senders[i]
+            subject = f"{message_subjects[i]} - {base_date_str}"
             
             # Create attachments
             attachments = []
-            num_attachments = random.randint(1, 3)
             
-            for j in range(num_attachments):
-                attachment_id = str(uuid.uuid4())
+            for j in range(attachment_counts[i]):
+                attachment_id = next(id_iter)
                 if j % 2 == 0:
                     # PDF attachment
                     filename = f"report_{i}_{j}.pdf"
@@ -76,7 +133,9 @@ class MockEmailServer:
                     content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 
                 # Store attachment data
-                self.attachment_data[f"{message_id}_{attachment_id}"] = content
+                attachment_key = f"{message_id}_{attachment_id}"
+                self.attachment_data[attachment_key] = content
+                self._attachment_paths[attachment_key] = self._blob_path(content)
                 
                 attachments.append({
                     "id": attachment_id,
@@ -95,7 +154,7 @@ class MockEmailServer:
                         "name": sender.split('@')[0].title()
                     }
                 },
-                "receivedDateTime": (datetime.now() - timedelta(minutes=random.randint(1, 1440))).isoformat() + "Z",
+                "receivedDateTime": (base_now - timedelta(minutes=received_offsets[i])).isoformat() + "Z",
                 "hasAttachments": len(attachments) > 0,
                 "attachments": attachments,
                 "body": {
@@ -105,9 +164,72 @@ class MockEmailServer:
             }
             
             self.messages.append(message)
+            self._by_id[message_id] = message
+            self._attachments_response[message_id] = _json_dumps({"value": attachments})
+    
+    def _blob_path(self, content: bytes) -> str:
+        """Write each distinct attachment blob to disk once and return its path"""
+        path = self._blob_paths.get(content)
+        if path is None:
+            if self._blob_dir is None:
+                self._blob_dir = tempfile.mkdtemp(prefix="mock_email_blobs_")
+                atexit.register(shutil.rmtree, self._blob_dir, ignore_errors=True)
+            path = os.path.join(self._blob_dir, f"blob_{len(self._blob_paths)}")
+            with open(path, 'wb') as f:
+                f.write(content)
+            self._blob_paths[content] = path
+        return path
+    
+    def _build_delta_responses(self):
+        """Precompute rings of serialized delta responses served round-robin by the handler"""
+        def render(messages: List[Dict[str, Any]]) -> bytes:
+            return _json_dumps({
+                "value": messages,
+                "@odata.deltaLink": self._delta_link_prefix + str(uuid.uuid4())
+            })
+        
+        # First request - return some messages
+        initial = [
+            render(self.messages[:random.randint(1, 5)])
+            for _ in range(DELTA_RESPONSE_VARIANTS)
+        ]
+        
+        # Subsequent requests - roughly 30% of variants carry new messages
+        updates = round(DELTA_RESPONSE_VARIANTS * 0.3)
+        subsequent = []
+        for i in range(DELTA_RESPONSE_VARIANTS):
+            if i < updates:
+                new_messages = self.messages[random.randint(0, min(3, len(self.messages)-1)):]
+                subsequent.append(render(new_messages[:random.randint(0, 2)]))
+            else:
+                subsequent.append(render([]))
+        random.shuffle(subsequent)
+        
+        self._initial_delta_cycle = itertools.cycle(initial)
+        self._subsequent_delta_cycle = itertools.cycle(subsequent)
     
     def _setup_routes(self):
         """Setup Flask routes to mimic Graph API endpoints"""
+        if self.app is not None:
+            return
+        
+        # Flask is imported here so the dataset can be built without it
+        from flask import Flask, Response, jsonify, request, send_file
+        self.app = Flask(__name__)
+        
+        if HAS_ORJSON:
+            from flask.json.provider import DefaultJSONProvider
+            
+            class OrjsonProvider(DefaultJSONProvider):
+                """Flask JSON provider backed by orjson"""
+                
+                def dumps(self, obj, **kwargs):
+                    return orjson.dumps(obj).decode()
+                
+                def loads(self, s, **kwargs):
+                    return orjson.loads(s)
+            
+            self.app.json = OrjsonProvider(self.app)
         
         @self.app.route('/v1.0/oauth2/v2.0/token', methods=['POST'])
         def get_token():
@@ -121,58 +243,38 @@ class MockEmailServer:
         @self.app.route('/v1.0/me/messages/delta', methods=['GET'])
         def get_messages_delta():
             """Mock delta query endpoint"""
-            # Simulate returning some messages
-            delta_token = request.args.get('$deltatoken')
-            
-            if not delta_token:
-                # First request - return some messages
-                messages_subset = self.messages[:random.randint(1, 5)]
-                new_delta_token = str(uuid.uuid4())
-                
-                return jsonify({
-                    "value": messages_subset,
-                    "@odata.deltaLink": f"http://localhost:{self.port}/v1.0/me/messages/delta?$deltatoken={new_delta_token}"
-                })
+            # Serve precomputed variants instead of drawing random data per request
+            if not request.args.get('$deltatoken'):
+                body = next(self._initial_delta_cycle)
             else:
-                # Subsequent request - return fewer or no new messages
-                if random.random() < 0.3:  # 30% chance of new messages
-                    new_messages = self.messages[random.randint(0, min(3, len(self.messages)-1)):]
-                    new_delta_token = str(uuid.uuid4())
-                    
-                    return jsonify({
-                        "value": new_messages[:random.randint(0, 2)],
-                        "@odata.deltaLink": f"http://localhost:{self.port}/v1.0/me/messages/delta?$deltatoken={new_delta_token}"
-                    })
-                else:
-                    # No new messages
-                    return jsonify({
-                        "value": [],
-                        "@odata.deltaLink": f"http://localhost:{self.port}/v1.0/me/messages/delta?$deltatoken={delta_token}"
-                    })
+                body = next(self._subsequent_delta_cycle)
+            
+            return Response(body, mimetype='application/json')
         
         @self.app.route('/v1.0/me/messages/<message_id>/attachments', methods=['GET'])
         def get_attachments(message_id):
             """Mock attachments endpoint"""
-            # Find message
-            message = next((m for m in self.messages if m['id'] == message_id), None)
-            if not message:
+            body = self._attachments_response.get(message_id)
+            if body is None:
                 return jsonify({"error": "Message not found"}), 404
             
-            return jsonify({
-                "value": message.get('attachments', [])
-            })
+            return Response(body, mimetype='application/json')
         
         @self.app.route('/v1.0/me/messages/<message_id>/attachments/<attachment_id>/$value', methods=['GET'])
         def download_attachment(message_id, attachment_id):
             """Mock attachment download endpoint"""
-            attachment_key = f"{message_id}_{attachment_id}"
+            if message_id not in self._by_id:
+                return jsonify({"error": "Message not found"}), 404
             
-            if attachment_key not in self.attachment_data:
+            attachment_key = f"{message_id}_{attachment_id}"
+            path = self._attachment_paths.get(attachment_key)
+            if path is None:
                 return jsonify({"error": "Attachment not found"}), 404
             
-            content = self.attachment_data[attachment_key]
+            # File-backed and conditional so Range requests stream from disk
             return send_file(
-                io.BytesIO(content),
+                path,
+                conditional=True,
                 as_attachment=True,
                 download_name=f"attachment_{attachment_id}",
                 mimetype='application/octet-stream'
@@ -181,14 +283,57 @@ class MockEmailServer:
         @self.app.route('/health', methods=['GET'])
         def health_check():
             """Health check endpoint"""
+            # Refresh the timestamp at most once per second
+            now = time.monotonic()
+            if now - self._health_timestamp_at >= 1.0:
+                self._health_timestamp = datetime.now().isoformat()
+                self._health_timestamp_at = now
+            
             return jsonify({
                 "status": "healthy",
                 "messages_count": len(self.messages),
-                "timestamp": datetime.now().isoformat()
+                "timestamp": self._health_timestamp
             })
     
+    def get_test_client(self):
+        """Return a requests.Session with a keep-alive pool sized for stress tests"""
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=64))
+        return session
+    
+    def get_async_test_client(self):
+        """Return an httpx.AsyncClient bound to this server with keep-alive connections"""
+        import httpx
+        
+        return httpx.AsyncClient(
+            base_url=f"http://localhost:{self.port}",
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+    
+    def _wait_until_ready(self, timeout: float = 5.0) -> bool:
+        """Poll the health endpoint until the server answers, then set the ready event"""
+        deadline = time.monotonic() + timeout
+        url = f"http://localhost:{self.port}/health"
+        while time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(url, timeout=0.5) as response:
+                    if response.status == 200:
+                        self._ready.set()
+                        break
+            except (urllib.error.URLError, ConnectionError, OSError):
+                pass
+            time.sleep(0.01)
+        
+        return self._ready.is_set()
+    
     def start_server(self):
         """Start the mock server in a separate thread"""
+        self.prepare()
+        self._setup_routes()
+        
         def run_server():
             self.app.run(
                 host='0.0.0.0',
@@ -201,18 +346,67 @@ class MockEmailServer:
         server_thread = threading.Thread(target=run_server, daemon=True)
         server_thread.start()
         
-        # Wait a bit for server to start
-        time.sleep(2)
+        if not self._wait_until_ready():
+            print(f"⚠️ Mock email server did not report healthy on port {self.port}")
         print(f"🚀 Mock email server started at http://localhost:{self.port}")
         print(f"   Health check: http://localhost:{self.port}/health")
         print(f"   Generated {len(self.messages)} dummy messages")
         
         return server_thread
+    
+    def start_server_processes(self, processes: Optional[int] = None) -> List[multiprocessing.Process]:
+        """Start the mock server in several forked processes sharing one listening socket
+        
+        Messages are generated before forking so every process shares the same
+        dataset copy-on-write. Requires the POSIX "fork" start method.
+        """
+        from werkzeug.serving import make_server
+        
+        processes = processes or os.cpu_count() or 1
+        self.prepare()
+        self._setup_routes()
+        
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('0.0.0.0', self.port))
+        sock.listen(128)
+        sock.set_inheritable(True)
+        
+        def run_server(fd: int):
+            server = make_server('0.0.0.0', self.port, self.app, threaded=True, fd=fd)
+            server.serve_forever()
+        
+        ctx = multiprocessing.get_context('fork')
+        workers = []
+        for _ in range(processes):
+            worker = ctx.Process(target=run_server, args=(sock.fileno(),), daemon=True)
+            worker.start()
+            workers.append(worker)
+        
+        # The children hold their own copies of the descriptor
+        sock.close()
+        
+        if not self._wait_until_ready():
+            print(f"⚠️ Mock email server did not report healthy on port {self.port}")
+        print(f"🚀 Mock email server started at http://localhost:{self.port} ({processes} processes)")
+        print(f"   Health check: http://localhost:{self.port}/health")
+        print(f"   Generated {len(self.messages)} dummy messages")
+        
+        return workers
 
 def main():
     """Run the mock server standalone"""
-    server = MockEmailServer()
-    server.start_server()
+    parser = argparse.ArgumentParser(description="Mock Microsoft Graph API server")
+    parser.add_argument("--port", type=int, default=5001, help="Port to listen on")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Number of server processes sharing the socket (0 = one per CPU)")
+    args = parser.parse_args()
+    
+    server = MockEmailServer(port=args.port)
+    if args.processes == 1:
+        server.start_server()
+    else:
+        server.start_server_processes(args.processes or None)
     
     try:
         # Keep the main thread alive
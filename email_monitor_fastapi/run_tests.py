@@ -9,8 +9,25 @@ import os
 import sys
 import subprocess
 import argparse
+import importlib.util
+import concurrent.futures
 from pathlib import Path
 
+# Stress suites that bind fixed ports (mock server on 5003, app on 8001);
+# they must never run alongside each other, so they only run serially
+STRESS_MODULES = ["simple_stress_test.py", "test_stress_local.py"]
+
+
+def parallel_args() -> list:
+    """pytest-xdist flags spreading test files across all cores
+    
+    Empty when pytest-xdist isn't installed (it is only in requirements_dev.txt),
+    so the tests still run, serially.
+    """
+    if importlib.util.find_spec("xdist") is None:
+        return []
+    return ["-n", "auto", "--dist=loadfile", *(f"--ignore={module}" for module in STRESS_MODULES)]
+
 
 def run_command(cmd: list, description: str) -> bool:
     """Run a command and return success status"""
@@ -31,6 +48,42 @@ def run_command(cmd: list, description: str) -> bool:
         return False
 
 
+def _run_captured(cmd: list) -> subprocess.CompletedProcess:
+    """Run a command with its output buffered for later printing"""
+    try:
+        return subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        return subprocess.CompletedProcess(cmd, 127, "", f"Command not found: {cmd[0]}\n")
+
+
+def run_commands_parallel(commands: list) -> bool:
+    """Run independent (cmd, description) pairs concurrently, reporting in order"""
+    max_workers = min(len(commands), os.cpu_count() or 1)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_run_captured, cmd) for cmd, _ in commands]
+        results = [future.result() for future in futures]
+    
+    success = True
+    for (cmd, description), result in zip(commands, results):
+        print(f"\n🔄 {description}")
+        print(f"Command: {' '.join(cmd)}")
+        print("-" * 50)
+        sys.stdout.write(result.stdout)
+        sys.stderr.write(result.stderr)
+        
+        if result.returncode == 0:
+            print(f"✅ {description} completed successfully")
+        elif result.returncode == 127:
+            print(f"❌ Command not found: {cmd[0]}")
+            print("Make sure all dependencies are installed: pip install -r requirements_dev.txt")
+            success = False
+        else:
+            print(f"❌ {description} failed with exit code {result.returncode}")
+            success = False
+    
+    return success
+
+
 def run_unit_tests():
     """Run unit tests only"""
     cmd = [
@@ -38,6 +91,7 @@ def run_unit_tests():
         "tests/",
         "-m", "unit",
         "-v", 
+        *parallel_args(),
         "--tb=short"
     ]
     return run_command(cmd, "Running unit tests")
@@ -50,6 +104,7 @@ def run_integration_tests():
         "tests/",
         "-m", "integration", 
         "-v",
+        *parallel_args(),
         "--tb=short"
     ]
     return run_command(cmd, "Running integration tests")
@@ -66,6 +121,7 @@ def run_all_tests():
         "--cov=worker_runner",
         "--cov-report=term-missing",
         "--cov-report=html:htmlcov",
+        *parallel_args(),
         "--tb=short"
     ]
     return run_command(cmd, "Running all tests with coverage")
@@ -83,6 +139,17 @@ def run_fast_tests():
     return run_command(cmd, "Running fast tests")
 
 
+def run_stress_tests():
+    """Run the fixed-port stress suites one after another, never in parallel"""
+    cmd = [
+        "python", "-m", "pytest",
+        *STRESS_MODULES,
+        "-v",
+        "--tb=short"
+    ]
+    return run_command(cmd, "Running stress tests")
+
+
 def run_redis_tests():
     """Run Redis-specific tests"""
     cmd = [
@@ -121,21 +188,14 @@ def run_api_tests():
 
 def lint_code():
     """Run code linting"""
-    success = True
+    targets = ["app/", "attachment_worker.py", "worker_runner.py", "tests/"]
     
-    # Flake8 linting
-    cmd = ["flake8", "app/", "attachment_worker.py", "worker_runner.py", "tests/"]
-    success &= run_command(cmd, "Running flake8 linting")
-    
-    # Black formatting check
-    cmd = ["black", "--check", "--diff", "app/", "attachment_worker.py", "worker_runner.py", "tests/"]
-    success &= run_command(cmd, "Checking code formatting with black")
-    
-    # Import sorting check  
-    cmd = ["isort", "--check-only", "--diff", "app/", "attachment_worker.py", "worker_runner.py", "tests/"]
-    success &= run_command(cmd, "Checking import sorting with isort")
-    
-    return success
+    # The checks are read-only and independent, so run them side by side
+    return run_commands_parallel([
+        (["flake8", *targets], "Running flake8 linting"),
+        (["black", "--check", "--diff", *targets], "Checking code formatting with black"),
+        (["isort", "--check-only", "--diff", *targets], "Checking import sorting with isort"),
+    ])
 
 
 def format_code():
@@ -166,6 +226,38 @@ def type_check():
     return run_command(cmd, "Running type checking with mypy")
 
 
+def run_ci_pipeline(fail_fast: bool = False):
+    """Run linting, then tests and type checking in a single pytest session
+    
+    flake8, black and isort run as their own (parallel) commands; their pytest
+    plugins are unmaintained and pytest-flake8 doesn't load with flake8 6+.
+    """
+    success = lint_code()
+    if not success and fail_fast:
+        return False
+    
+    cmd = [
+        "python", "-m", "pytest",
+        "tests/",
+        "app/",
+        "attachment_worker.py",
+        "worker_runner.py",
+        "--mypy",
+        "--mypy-ignore-missing-imports",
+        "-v",
+        "--cov=app",
+        "--cov=attachment_worker",
+        "--cov=worker_runner",
+        "--cov-report=term-missing",
+        "--cov-report=html:htmlcov",
+        *parallel_args(),
+        "--tb=short"
+    ]
+    if fail_fast:
+        cmd.append("--maxfail=1")
+    return run_command(cmd, "Running CI pipeline") and success
+
+
 def run_security_check():
     """Run security checks"""
     # Check for common security issues
@@ -241,7 +333,9 @@ Examples:
   python run_tests.py --unit               # Run unit tests only  
   python run_tests.py --integration        # Run integration tests only
   python run_tests.py --fast               # Run fast tests only
+  python run_tests.py --stress             # Run the stress suites serially
   python run_tests.py --lint               # Run linting only
+  python run_tests.py --ci --fail-fast     # Run CI, stopping at the first failure
   python run_tests.py --format             # Format code
   python run_tests.py --setup              # Setup test environment
   python run_tests.py --cleanup            # Cleanup test artifacts
@@ -252,6 +346,7 @@ Examples:
     parser.add_argument("--unit", action="store_true", help="Run unit tests only")
     parser.add_argument("--integration", action="store_true", help="Run integration tests only")
     parser.add_argument("--fast", action="store_true", help="Run fast tests only")
+    parser.add_argument("--stress", action="store_true", help="Run the stress suites serially")
     parser.add_argument("--redis", action="store_true", help="Run Redis tests only")
     parser.add_argument("--worker", action="store_true", help="Run worker tests only")
     parser.add_argument("--api", action="store_true", help="Run API tests only")
@@ -262,6 +357,7 @@ Examples:
     parser.add_argument("--setup", action="store_true", help="Setup test environment")
     parser.add_argument("--cleanup", action="store_true", help="Cleanup test artifacts")
     parser.add_argument("--ci", action="store_true", help="Run full CI pipeline")
+    parser.add_argument("--fail-fast", action="store_true", help="Stop the CI pipeline at the first failure")
     
     args = parser.parse_args()
     
@@ -289,6 +385,8 @@ Examples:
         success = run_integration_tests()
     elif args.fast:
         success = run_fast_tests()
+    elif args.stress:
+        success = run_stress_tests()
     elif args.redis:
         success = run_redis_tests()
     elif args.worker:
@@ -298,9 +396,7 @@ Examples:
     elif args.ci:
         # Full CI pipeline
         print("🚀 Running full CI pipeline...")
-        success &= lint_code()
-        success &= type_check() 
-        success &= run_all_tests()
+        success = run_ci_pipeline(fail_fast=args.fail_fast)
     elif args.all:
         success = run_all_tests()
     else:
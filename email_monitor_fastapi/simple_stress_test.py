@@ -1,6 +1,7 @@
 """
 Simplified Stress Test for Email Monitor FastAPI Service
-Uses only Python standard library to avoid dependency issues
+Uses the Python standard library plus httpx (already an app requirement) for the async
+clients; the mock server runs on uvicorn/Starlette when both are available
 """
 
 import unittest
@@ -14,21 +15,144 @@ import uuid
 import random
 from pathlib import Path
 from unittest.mock import Mock, MagicMock
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import sys
 import os
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import http.client
+import socket
 import socketserver
+import multiprocessing
+import urllib.error
 import urllib.parse
 import io
+import itertools
+from collections import Counter
+
+import httpx
+
+try:
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Route
+    HAS_UVICORN = True
+except ImportError:
+    HAS_UVICORN = False
+
+try:
+    import uvloop  # noqa: F401
+    HAS_UVLOOP = True
+except ImportError:
+    HAS_UVLOOP = False
 
 # Add the parent directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+# Static response bodies, serialized once at import
+_AUTH_BODY = json.dumps({
+    "access_token": "mock_token_123",
+    "token_type": "Bearer",
+    "expires_in": 3600
+}).encode('utf-8')
+
+_ATTACH_LIST_BODY = json.dumps({
+    "value": [
+        {
+            "id": str(uuid.uuid4()),
+            "name": "test_document.pdf",
+            "contentType": "application/pdf",
+            "size": 1024,
+            "isInline": False
+        },
+        {
+            "id": str(uuid.uuid4()),
+            "name": "data_file.xlsx",
+            "contentType": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            "size": 2048,
+            "isInline": False
+        }
+    ]
+}).encode('utf-8')
+
+# Health body split around the only per-request field, the timestamp
+_HEALTH_PREFIX = b'{"status": "healthy", "messages_count": 20, "timestamp": "'
+_HEALTH_SUFFIX = b'"}'
+
+_ATTACHMENT_CONTENT = b"Mock file content for testing purposes"
+
+# Ids handed out round-robin instead of calling uuid.uuid4() per message
+_UUID_POOL = itertools.cycle([str(uuid.uuid4()) for _ in range(1000)])
+
+
+def _message_template(i, lite):
+    """Serialize dummy message i once, split around its id and timestamp"""
+    message = {
+        "id": "__ID__",
+        "subject": f"Test Message {i}",
+        "from": {
+            "emailAddress": {
+                "address": f"test{i}@company.com",
+                "name": f"Test User {i}"
+            }
+        },
+        "receivedDateTime": "__TS__",
+        "hasAttachments": not lite
+    }
+    if not lite:
+        message["body"] = {
+            "content": f"Test content {i}",
+            "contentType": "text"
+        }
+    
+    head, rest = json.dumps(message).encode('utf-8').split(b'__ID__')
+    middle, tail = rest.split(b'__TS__')
+    return head, middle, tail
+
+
+# Per-position message fragments for full and lite delta responses
+_MESSAGE_TEMPLATES = {
+    lite: [_message_template(i, lite) for i in range(5)]
+    for lite in (False, True)
+}
+
+
+def _health_body():
+    """Health check body with a fresh timestamp"""
+    timestamp = datetime.now().isoformat().encode('ascii')
+    return _HEALTH_PREFIX + timestamp + _HEALTH_SUFFIX
+
+
+def _delta_body(lite):
+    """Delta query body with 0-5 messages
+    
+    With lite=True the messages carry no attachments or body, for tests that
+    only measure delta-query throughput.
+    """
+    received = (datetime.now().isoformat() + "Z").encode('ascii')
+    
+    # Fill the prebuilt templates with fresh ids rather than serializing dicts
+    templates = _MESSAGE_TEMPLATES[lite]
+    messages = b','.join(
+        head + next(_UUID_POOL).encode('ascii') + middle + received + tail
+        for head, middle, tail in templates[:random.randint(0, 5)]
+    )
+    
+    delta_link = f"http://localhost:5003/v1.0/me/messages/delta?$deltatoken={next(_UUID_POOL)}"
+    if lite:
+        delta_link += "&lite=1"
+    
+    return b'{"value": [' + messages + b'], "@odata.deltaLink": "' + delta_link.encode('ascii') + b'"}'
+
+
 class MockHTTPHandler(BaseHTTPRequestHandler):
     """Simple HTTP handler to simulate email server responses"""
     
+    # Keep connections open between requests so clients can reuse them;
+    # with Nagle left on, the separate header/body writes stall on delayed ACKs
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    
     def log_message(self, format, *args):
         """Suppress HTTP server logging"""
         pass
@@ -55,114 +179,189 @@ class MockHTTPHandler(BaseHTTPRequestHandler):
     
     def send_health_response(self):
         """Send health check response"""
-        response = {
-            "status": "healthy",
-            "messages_count": 20,
-            "timestamp": datetime.now().isoformat()
-        }
-        self.send_json_response(response)
+        self._send_precomputed(_health_body())
     
     def send_auth_response(self):
         """Send authentication response"""
-        response = {
-            "access_token": "mock_token_123",
-            "token_type": "Bearer",
-            "expires_in": 3600
-        }
-        self.send_json_response(response)
+        self._send_precomputed(_AUTH_BODY)
     
     def send_messages_response(self):
-        """Send mock messages response"""
-        # Generate some dummy messages
-        messages = []
-        for i in range(random.randint(0, 5)):
-            message_id = str(uuid.uuid4())
-            messages.append({
-                "id": message_id,
-                "subject": f"Test Message {i}",
-                "from": {
-                    "emailAddress": {
-                        "address": f"test{i}@company.com",
-                        "name": f"Test User {i}"
-                    }
-                },
-                "receivedDateTime": datetime.now().isoformat() + "Z",
-                "hasAttachments": True,
-                "body": {
-                    "content": f"Test content {i}",
-                    "contentType": "text"
-                }
-            })
-        
-        response = {
-            "value": messages,
-            "@odata.deltaLink": f"http://localhost:5003/v1.0/me/messages/delta?$deltatoken={uuid.uuid4()}"
-        }
-        self.send_json_response(response)
+        """Send mock messages response (?lite=1 for the lite variant)"""
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        self._send_precomputed(_delta_body(query.get('lite') == ['1']))
     
     def send_attachments_list(self):
         """Send mock attachments list"""
-        attachments = [
-            {
-                "id": str(uuid.uuid4()),
-                "name": "test_document.pdf",
-                "contentType": "application/pdf",
-                "size": 1024,
-                "isInline": False
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "name": "data_file.xlsx",
-                "contentType": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                "size": 2048,
-                "isInline": False
-            }
-        ]
-        
-        response = {"value": attachments}
-        self.send_json_response(response)
+        self._send_precomputed(_ATTACH_LIST_BODY)
     
     def send_attachment_content(self):
         """Send mock attachment content"""
         # Send some dummy file content
-        content = b"Mock file content for testing purposes"
-        
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/octet-stream')
-        self.send_header('Content-Length', str(len(content)))
-        self.end_headers()
-        self.wfile.write(content)
+        self._send_precomputed(_ATTACHMENT_CONTENT, 'application/octet-stream')
     
-    def send_json_response(self, data):
-        """Send JSON response"""
-        response_data = json.dumps(data).encode('utf-8')
-        
+    def _send_precomputed(self, body, content_type='application/json'):
+        """Send an already-serialized response body"""
         self.send_response(200)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Content-Length', str(len(response_data)))
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(response_data)
+        self.wfile.write(body)
+
+
+class MockThreadingHTTPServer(ThreadingHTTPServer):
+    """Thread-per-connection server with a listen backlog sized for the concurrency tests"""
+    
+    # The socketserver default of 5 drops SYNs when many clients connect at once
+    request_queue_size = 128
+    daemon_threads = True
+    block_on_close = False
+    reuse_port = False
+    
+    def server_bind(self):
+        """Bind, letting sibling processes share the port when reuse_port is set"""
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+class ReusePortHTTPServer(MockThreadingHTTPServer):
+    """Mock server variant that can listen alongside other processes on one port"""
+    
+    reuse_port = True
+
+
+def _ensure_port_free(port):
+    """Raise OSError if anything already listens on port
+    
+    The probe binds without SO_REUSEPORT, so it fails even against a stale
+    SO_REUSEPORT mock that the real listeners would otherwise silently join.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        probe.bind(('localhost', port))
+
+
+def _serve_mock(port):
+    """Entry point for forked mock server processes"""
+    server = ReusePortHTTPServer(('localhost', port), MockHTTPHandler)
+    server.serve_forever()
+
+
+def create_asgi_mock_app():
+    """Starlette app serving the same precomputed bodies as MockHTTPHandler"""
+    
+    def precomputed(body, media_type='application/json'):
+        return Response(body, media_type=media_type)
+    
+    async def health(request):
+        return precomputed(_health_body())
+    
+    async def token(request):
+        return precomputed(_AUTH_BODY)
+    
+    async def delta(request):
+        return precomputed(_delta_body(request.query_params.get('lite') == '1'))
+    
+    async def attachments(request):
+        return precomputed(_ATTACH_LIST_BODY)
+    
+    async def attachment_content(request):
+        return precomputed(_ATTACHMENT_CONTENT, 'application/octet-stream')
+    
+    return Starlette(routes=[
+        Route('/health', health),
+        Route('/token', token, methods=['POST']),
+        Route('/{tenant:path}/token', token, methods=['POST']),
+        Route('/v1.0/me/messages/delta', delta),
+        Route('/v1.0/me/messages/{mid}/attachments', attachments),
+        Route('/v1.0/me/messages/{mid}/attachments/{aid}/$value', attachment_content),
+    ])
 
 
 class SimpleMockServer:
-    """Simple mock server using Python's built-in HTTP server"""
+    """Simple mock server using Python's built-in HTTP server
+    
+    With use_asgi the same routes are served from an asyncio ASGI app on
+    uvicorn (on uvloop if available), in a single process. Otherwise, with
+    processes > 1 (and SO_REUSEPORT available), forked stdlib servers listen
+    on the same port and the kernel spreads connections across them.
+    """
     
-    def __init__(self, port=5003):
+    def __init__(self, port=5003, processes=1, use_asgi=HAS_UVICORN):
+        if use_asgi and processes > 1:
+            raise ValueError("The ASGI mock server runs in a single process")
         self.port = port
+        self.processes = processes
+        self.use_asgi = use_asgi
         self.server = None
         self.server_thread = None
+        self.children = []
+    
+    def _wait_until(self, ready, timeout=10):
+        """Poll ready() until it is true, failing after timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while not ready():
+            if not self.server_thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("mock server did not start")
+            time.sleep(0.01)
+    
+    def _answers_health(self):
+        """True once the server answers /health"""
+        conn = http.client.HTTPConnection('localhost', self.port, timeout=1)
+        try:
+            conn.request('GET', '/health')
+            return conn.getresponse().status == 200
+        except OSError:
+            return False
+        finally:
+            conn.close()
+    
+    def _start_asgi(self):
+        """Run uvicorn in a background thread and wait until it is listening"""
+        config = uvicorn.Config(
+            create_asgi_mock_app(),
+            host='localhost',
+            port=self.port,
+            log_level='critical',
+            loop='uvloop' if HAS_UVLOOP else 'asyncio',
+            lifespan='off',
+        )
+        self.server = uvicorn.Server(config)
+        self.server_thread = threading.Thread(target=self.server.run, daemon=True)
+        self.server_thread.start()
+        
+        self._wait_until(lambda: self.server.started)
+        
+        print(f"✅ ASGI mock server started at http://localhost:{self.port}")
+        return True
     
     def start(self):
         """Start the mock server"""
         try:
-            self.server = HTTPServer(('localhost', self.port), MockHTTPHandler)
+            if self.use_asgi:
+                return self._start_asgi()
+            
+            multi_process = self.processes > 1 and hasattr(socket, 'SO_REUSEPORT')
+            
+            # Fork before starting any server thread in this process
+            if multi_process:
+                _ensure_port_free(self.port)
+                ctx = multiprocessing.get_context('fork')
+                for _ in range(self.processes - 1):
+                    child = ctx.Process(target=_serve_mock, args=(self.port,), daemon=True)
+                    child.start()
+                    self.children.append(child)
+            
+            # Threaded so persistent client connections don't block each other
+            server_class = ReusePortHTTPServer if multi_process else MockThreadingHTTPServer
+            self.server = server_class(('localhost', self.port), MockHTTPHandler)
             self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
             self.server_thread.start()
             
-            # Wait a bit for server to start
-            time.sleep(1)
+            self._wait_until(self._answers_health)
             
-            print(f"✅ Simple mock server started at http://localhost:{self.port}")
+            print(f"✅ Simple mock server started at http://localhost:{self.port} "
+                  f"({len(self.children) + 1} process(es))")
             return True
         except Exception as e:
             print(f"❌ Failed to start mock server: {e}")
@@ -170,9 +369,99 @@ class SimpleMockServer:
     
     def stop(self):
         """Stop the mock server"""
-        if self.server:
+        if self.use_asgi:
+            if self.server:
+                self.server.should_exit = True
+                self.server_thread.join(timeout=5)
+        elif self.server:
             self.server.shutdown()
             self.server.server_close()
+        for child in self.children:
+            child.terminate()
+        for child in self.children:
+            child.join(timeout=5)
+        self.children = []
+
+
+# Buffer size for streaming attachment bodies to disk
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class TunedHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection with Nagle disabled and TCP keepalive probes enabled"""
+    
+    def connect(self):
+        super().connect()
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+
+class KeepAliveTransport:
+    """Pool of persistent HTTP/1.1 connections to one server, one per thread"""
+    
+    def __init__(self, base_url):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self._local = threading.local()
+    
+    def _connection(self, timeout):
+        """Get this thread's connection, creating it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = TunedHTTPConnection(self.host, self.port, timeout=timeout)
+            self._local.conn = conn
+        elif conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        conn.timeout = timeout
+        return conn
+    
+    def _open(self, url, timeout):
+        """Send a GET and return the response with its body still unread"""
+        parsed = urllib.parse.urlsplit(url)
+        path = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+        
+        # Retry once on a fresh connection if the server dropped the idle one
+        for attempt in range(2):
+            conn = self._connection(timeout)
+            try:
+                conn.request('GET', path)
+                return conn.getresponse()
+            except (http.client.HTTPException, ConnectionError):
+                self._discard(conn)
+                if attempt:
+                    raise
+    
+    def _discard(self, conn):
+        """Drop a connection whose state can no longer be trusted"""
+        conn.close()
+        self._local.conn = None
+    
+    def get(self, url, timeout=10):
+        """GET a URL on this server and return the response body"""
+        response = self._open(url, timeout)
+        try:
+            body = response.read()
+        except Exception:
+            self._discard(self._local.conn)
+            raise
+        
+        if response.status >= 400:
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+        return body
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(base_url):
+    """Return the keep-alive transport shared by all clients of base_url"""
+    with _transports_lock:
+        transport = _transports.get(base_url)
+        if transport is None:
+            transport = _transports[base_url] = KeepAliveTransport(base_url)
+        return transport
 
 
 class SimpleGraphEmailClient:
@@ -182,30 +471,29 @@ class SimpleGraphEmailClient:
         self.mock_server_url = mock_server_url
         self.access_token = None
         self.delta_link = None
+        self._transport = get_transport(mock_server_url)
     
     def authenticate(self) -> bool:
         """Simple authentication test"""
         try:
             # Just check if server is reachable
-            import urllib.request
-            urllib.request.urlopen(f"{self.mock_server_url}/health", timeout=2)
+            self._transport.get(f"{self.mock_server_url}/health", timeout=2)
             self.access_token = "test_token"
             return True
         except Exception as e:
             print(f"Auth failed: {e}")
             return False
     
-    def get_new_messages(self, email_groups=None):
-        """Get messages from mock server"""
+    def get_new_messages(self, email_groups=None, lite=False):
+        """Get messages from mock server (lite: ask for attachment-free messages)"""
         if not self.access_token:
             return []
         
         try:
-            import urllib.request
             url = self.delta_link or f"{self.mock_server_url}/v1.0/me/messages/delta"
-            
-            with urllib.request.urlopen(url, timeout=10) as response:
-                data = json.loads(response.read().decode('utf-8'))
+            if lite and not self.delta_link:
+                url += "?lite=1"
+            data = json.loads(self._transport.get(url, timeout=10))
             
             # Store delta link for next request
             if '@odata.deltaLink' in data:
@@ -223,11 +511,8 @@ class SimpleGraphEmailClient:
             return []
         
         try:
-            import urllib.request
             url = f"{self.mock_server_url}/v1.0/me/messages/{message_id}/attachments"
-            
-            with urllib.request.urlopen(url, timeout=10) as response:
-                data = json.loads(response.read().decode('utf-8'))
+            data = json.loads(self._transport.get(url, timeout=10))
             
             return data.get('value', [])
             
@@ -241,23 +526,129 @@ class SimpleGraphEmailClient:
             return b""
         
         try:
-            import urllib.request
             url = f"{self.mock_server_url}/v1.0/me/messages/{message_id}/attachments/{attachment_id}/$value"
+            return self._transport.get(url, timeout=10)
+                
+        except Exception as e:
+            print(f"Error downloading attachment: {e}")
+            return b""
+
+
+def create_async_http_client(max_connections=32):
+    """Async HTTP client whose pooled keep-alive connections are shared by its callers"""
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return httpx.AsyncClient(limits=limits, timeout=10)
+
+
+class AsyncSimpleGraphEmailClient:
+    """Coroutine counterpart of SimpleGraphEmailClient over a shared httpx.AsyncClient"""
+    
+    def __init__(self, http_client, mock_server_url="http://localhost:5003"):
+        self.mock_server_url = mock_server_url
+        self.access_token = None
+        self.delta_link = None
+        self._http = http_client
+    
+    async def _get(self, url, timeout=10):
+        """GET a URL and return the response body"""
+        response = await self._http.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+    
+    async def authenticate(self) -> bool:
+        """Simple authentication test"""
+        try:
+            await self._get(f"{self.mock_server_url}/health", timeout=2)
+            self.access_token = "test_token"
+            return True
+        except Exception as e:
+            print(f"Auth failed: {e}")
+            return False
+    
+    async def get_new_messages(self, email_groups=None):
+        """Get messages from mock server"""
+        if not self.access_token:
+            return []
+        
+        try:
+            url = self.delta_link or f"{self.mock_server_url}/v1.0/me/messages/delta"
+            data = json.loads(await self._get(url))
             
-            with urllib.request.urlopen(url, timeout=10) as response:
-                return response.read()
+            # Store delta link for next request
+            if '@odata.deltaLink' in data:
+                self.delta_link = data['@odata.deltaLink']
+            
+            return data.get('value', [])
+            
+        except Exception as e:
+            print(f"Error fetching messages: {e}")
+            return []
+    
+    async def get_attachments(self, message_id):
+        """Get attachments for a message"""
+        if not self.access_token:
+            return []
+        
+        try:
+            url = f"{self.mock_server_url}/v1.0/me/messages/{message_id}/attachments"
+            data = json.loads(await self._get(url))
+            
+            return data.get('value', [])
+            
+        except Exception as e:
+            print(f"Error fetching attachments: {e}")
+            return []
+    
+    async def download_attachment(self, message_id, attachment_id):
+        """Download attachment content"""
+        if not self.access_token:
+            return b""
+        
+        try:
+            url = f"{self.mock_server_url}/v1.0/me/messages/{message_id}/attachments/{attachment_id}/$value"
+            return await self._get(url)
                 
         except Exception as e:
             print(f"Error downloading attachment: {e}")
             return b""
+    
+    async def download_attachment_to(self, message_id, attachment_id, path):
+        """Stream attachment content straight to a file, returning the bytes written"""
+        if not self.access_token:
+            return 0
+        
+        try:
+            url = f"{self.mock_server_url}/v1.0/me/messages/{message_id}/attachments/{attachment_id}/$value"
+            written = 0
+            async with self._http.stream('GET', url, timeout=10) as response:
+                response.raise_for_status()
+                f = await asyncio.to_thread(open, path, 'wb')
+                try:
+                    async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                        await asyncio.to_thread(f.write, chunk)
+                        written += len(chunk)
+                finally:
+                    await asyncio.to_thread(f.close)
+            return written
+                
+        except Exception as e:
+            print(f"Error downloading attachment: {e}")
+            return 0
 
 
 class SimpleEmailMonitor:
     """Simplified email monitor for testing"""
     
-    def __init__(self, mock_server_url="http://localhost:5003"):
+    def __init__(self, mock_server_url="http://localhost:5003", base_dir=None):
         self.graph_client = SimpleGraphEmailClient(mock_server_url)
-        self.attachments_dir = Path(tempfile.mkdtemp()) / "attachments"
+        # Async client for attachment fan-out, created on first use inside the
+        # running loop and kept across cycles so its connections are reused
+        self._http = None
+        if base_dir is None:
+            self.attachments_dir = Path(tempfile.mkdtemp()) / "attachments"
+        else:
+            # Share the caller's temp root instead of creating a new one
+            self.attachments_dir = Path(base_dir) / f"att_{uuid.uuid4().hex[:8]}"
         self.attachments_dir.mkdir(parents=True, exist_ok=True)
         
         self.stats = {
@@ -271,17 +662,24 @@ class SimpleEmailMonitor:
     async def process_emails(self):
         """Process emails asynchronously"""
         try:
-            # Authenticate
-            if not self.graph_client.authenticate():
+            # Authenticate (blocking client calls run in worker threads)
+            if not await asyncio.to_thread(self.graph_client.authenticate):
                 self.stats['errors'] += 1
                 return
             
             # Get messages
-            messages = self.graph_client.get_new_messages()
+            messages = await asyncio.to_thread(self.graph_client.get_new_messages)
+            
+            # Fan attachment requests out over the monitor's pooled connections
+            if self._http is None:
+                self._http = create_async_http_client()
+            attachment_client = AsyncSimpleGraphEmailClient(self._http, self.graph_client.mock_server_url)
+            attachment_client.access_token = self.graph_client.access_token
             
-            # Process each message
-            for message in messages:
-                await self._process_message(message)
+            # Process messages concurrently
+            await asyncio.gather(*(
+                self._process_message(message, attachment_client) for message in messages
+            ))
             
             # Update stats
             self.stats['messages_processed'] += len(messages)
@@ -292,7 +690,13 @@ class SimpleEmailMonitor:
             print(f"Processing error: {e}")
             self.stats['errors'] += 1
     
-    async def _process_message(self, message):
+    async def aclose(self):
+        """Close the async client; call before the event loop that used it ends"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+    
+    async def _process_message(self, message, attachment_client):
         """Process single message"""
         message_id = message.get('id', '')
         
@@ -300,35 +704,46 @@ class SimpleEmailMonitor:
             return
         
         # Get attachments
-        attachments = self.graph_client.get_attachments(message_id)
+        attachments = await attachment_client.get_attachments(message_id)
+        
+        # Stream all attachments to disk concurrently
+        file_paths = [
+            self.attachments_dir / f"{message_id[:8]}_{attachment.get('name', 'unknown')}"
+            for attachment in attachments
+        ]
+        sizes = await asyncio.gather(*(
+            attachment_client.download_attachment_to(message_id, attachment.get('id', ''), file_path)
+            for attachment, file_path in zip(attachments, file_paths)
+        ))
         
         # Process attachments
-        for attachment in attachments:
-            # Download attachment
-            content = self.graph_client.download_attachment(message_id, attachment.get('id', ''))
-            
-            if content:
-                # Save to file
-                filename = attachment.get('name', 'unknown')
-                file_path = self.attachments_dir / f"{message_id[:8]}_{filename}"
-                file_path.write_bytes(content)
-                
+        for file_path, size in zip(file_paths, sizes):
+            if size:
                 self.stats['attachments_processed'] += 1
+            else:
+                await asyncio.to_thread(file_path.unlink, True)
 
 
 class SimpleStressTest(unittest.TestCase):
-    """Simplified stress test using only standard library"""
+    """Simplified stress test using the standard library plus httpx"""
     
     @classmethod
     def setUpClass(cls):
         """Set up test environment"""
         print("🔧 Setting up simple stress test environment...")
         
-        # Start mock server
-        cls.mock_server = SimpleMockServer(port=5003)
+        # Start mock server: one ASGI process when uvicorn is installed,
+        # otherwise stdlib servers forked across the cores
+        if HAS_UVICORN:
+            cls.mock_server = SimpleMockServer(port=5003, use_asgi=True)
+        else:
+            cls.mock_server = SimpleMockServer(port=5003, processes=os.cpu_count() or 1, use_asgi=False)
         if not cls.mock_server.start():
             raise Exception("Failed to start mock server")
         
+        # One temp root for the whole class; monitors create subdirectories in it
+        cls.temp_root = Path(tempfile.mkdtemp())
+        
         print("✅ Test environment ready")
     
     @classmethod
@@ -336,16 +751,11 @@ class SimpleStressTest(unittest.TestCase):
         """Clean up test environment"""
         print("🧹 Cleaning up test environment...")
         cls.mock_server.stop()
+        shutil.rmtree(cls.temp_root, ignore_errors=True)
     
     def setUp(self):
         """Set up individual test"""
-        self.temp_dir = Path(tempfile.mkdtemp())
-        self.monitor = SimpleEmailMonitor()
-    
-    def tearDown(self):
-        """Clean up individual test"""
-        if self.temp_dir.exists():
-            shutil.rmtree(self.temp_dir)
+        self.monitor = SimpleEmailMonitor(base_dir=self.temp_root)
     
     def test_basic_functionality(self):
         """Test basic email processing functionality"""
@@ -364,18 +774,14 @@ class SimpleStressTest(unittest.TestCase):
         """Test multiple concurrent authentications"""
         print("🔄 Testing concurrent authentication...")
         
-        def authenticate():
-            client = SimpleGraphEmailClient()
-            return client.authenticate()
+        async def run_all():
+            async with create_async_http_client() as http:
+                # One client shared by every concurrent authentication
+                client = AsyncSimpleGraphEmailClient(http)
+                return await asyncio.gather(*(client.authenticate() for _ in range(20)))
         
         # Test with 20 concurrent authentications
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            futures = [executor.submit(authenticate) for _ in range(20)]
-            
-            success_count = 0
-            for future in as_completed(futures):
-                if future.result():
-                    success_count += 1
+        success_count = sum(asyncio.run(run_all()))
         
         print(f"✅ {success_count}/20 authentications succeeded")
         self.assertGreaterEqual(success_count, 18)  # Allow for some failures
@@ -390,9 +796,9 @@ class SimpleStressTest(unittest.TestCase):
         start_time = time.time()
         total_messages = 0
         
-        # Fetch messages 50 times rapidly
+        # Fetch messages 50 times rapidly, without attachment payloads
         for _ in range(50):
-            messages = client.get_new_messages()
+            messages = client.get_new_messages(lite=True)
             total_messages += len(messages)
         
         duration = time.time() - start_time
@@ -404,19 +810,18 @@ class SimpleStressTest(unittest.TestCase):
         """Test concurrent message fetching"""
         print("🔄 Testing concurrent message fetching...")
         
-        def fetch_messages():
-            client = SimpleGraphEmailClient()
-            if client.authenticate():
-                return len(client.get_new_messages())
+        async def fetch_messages(http):
+            client = AsyncSimpleGraphEmailClient(http)
+            if await client.authenticate():
+                return len(await client.get_new_messages())
             return 0
         
+        async def run_all():
+            async with create_async_http_client() as http:
+                return await asyncio.gather(*(fetch_messages(http) for _ in range(15)))
+        
         # Test with 15 concurrent clients
-        with ThreadPoolExecutor(max_workers=8) as executor:
-            futures = [executor.submit(fetch_messages) for _ in range(15)]
-            
-            total_messages = 0
-            for future in as_completed(futures):
-                total_messages += future.result()
+        total_messages = sum(asyncio.run(run_all()))
         
         print(f"✅ Total messages fetched: {total_messages}")
         self.assertGreaterEqual(total_messages, 0)
@@ -452,21 +857,21 @@ class SimpleStressTest(unittest.TestCase):
         """Test multiple processing cycles"""
         print("🔄 Testing processing cycles...")
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        async def run_cycles():
+            try:
+                # Run 5 processing cycles
+                for i in range(5):
+                    cycle_start = time.time()
+                    await self.monitor.process_emails()
+                    cycle_time = time.time() - cycle_start
+                    
+                    print(f"   Cycle {i+1}: {cycle_time:.2f}s, "
+                          f"Messages: {self.monitor.stats['messages_processed']}, "
+                          f"Attachments: {self.monitor.stats['attachments_processed']}")
+            finally:
+                await self.monitor.aclose()
         
-        try:
-            # Run 5 processing cycles
-            for i in range(5):
-                cycle_start = time.time()
-                loop.run_until_complete(self.monitor.process_emails())
-                cycle_time = time.time() - cycle_start
-                
-                print(f"   Cycle {i+1}: {cycle_time:.2f}s, "
-                      f"Messages: {self.monitor.stats['messages_processed']}, "
-                      f"Attachments: {self.monitor.stats['attachments_processed']}")
-        finally:
-            loop.close()
+        asyncio.run(run_cycles())
         
         print(f"✅ Completed {self.monitor.stats['total_runs']} processing cycles")
         self.assertEqual(self.monitor.stats['total_runs'], 5)
@@ -475,102 +880,102 @@ class SimpleStressTest(unittest.TestCase):
         """Test concurrent processing cycles"""
         print("🔄 Testing concurrent processing...")
         
-        def run_processing():
-            monitor = SimpleEmailMonitor()
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
+        async def run_processing():
+            monitor = SimpleEmailMonitor(base_dir=self.temp_root)
             try:
                 # Run 3 cycles
                 for _ in range(3):
-                    loop.run_until_complete(monitor.process_emails())
-                return monitor.stats['total_runs']
+                    await monitor.process_emails()
             finally:
-                loop.close()
+                await monitor.aclose()
+            return monitor.stats['total_runs']
         
-        # Run 4 concurrent processing threads
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = [executor.submit(run_processing) for _ in range(4)]
-            
-            total_runs = 0
-            for future in as_completed(futures):
-                total_runs += future.result()
+        async def run_all():
+            return await asyncio.gather(*(run_processing() for _ in range(4)))
+        
+        # Run 4 concurrent processing workers on one event loop
+        total_runs = sum(asyncio.run(run_all()))
         
         print(f"✅ Concurrent processing completed, total runs: {total_runs}")
-        self.assertEqual(total_runs, 12)  # 4 threads × 3 cycles each
+        self.assertEqual(total_runs, 12)  # 4 workers × 3 cycles each
     
     def test_stress_scenario(self):
         """Test complete stress scenario"""
         print("🔄 Running comprehensive stress test...")
         
-        results = {
+        results = Counter({
             'authentications': 0,
             'message_fetches': 0,
             'attachment_downloads': 0,
             'processing_cycles': 0,
             'errors': 0
-        }
+        })
         
-        def auth_worker():
+        # Each worker tallies into its own Counter, merged once when it finishes
+        async def auth_worker(http):
             """Worker that performs authentications"""
+            counts = Counter()
+            client = AsyncSimpleGraphEmailClient(http)
             try:
                 for _ in range(10):
-                    client = SimpleGraphEmailClient()
-                    if client.authenticate():
-                        results['authentications'] += 1
-                    time.sleep(0.1)
+                    if await client.authenticate():
+                        counts['authentications'] += 1
+                    await asyncio.sleep(0.1)
             except Exception:
-                results['errors'] += 1
+                counts['errors'] += 1
+            return counts
         
-        def message_worker():
+        async def message_worker(http):
             """Worker that fetches messages"""
+            counts = Counter()
             try:
-                client = SimpleGraphEmailClient()
-                if client.authenticate():
+                client = AsyncSimpleGraphEmailClient(http)
+                if await client.authenticate():
                     for _ in range(10):
-                        messages = client.get_new_messages()
-                        results['message_fetches'] += len(messages)
-                        time.sleep(0.1)
+                        messages = await client.get_new_messages()
+                        counts['message_fetches'] += len(messages)
+                        await asyncio.sleep(0.1)
             except Exception:
-                results['errors'] += 1
+                counts['errors'] += 1
+            return counts
         
-        def processing_worker():
+        async def processing_worker():
             """Worker that runs processing cycles"""
+            counts = Counter()
+            monitor = SimpleEmailMonitor(base_dir=self.temp_root)
             try:
-                monitor = SimpleEmailMonitor()
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                try:
-                    for _ in range(3):
-                        loop.run_until_complete(monitor.process_emails())
-                        results['processing_cycles'] += 1
-                        time.sleep(0.2)
-                finally:
-                    loop.close()
+                for _ in range(3):
+                    await monitor.process_emails()
+                    counts['processing_cycles'] += 1
+                    await asyncio.sleep(0.2)
             except Exception:
-                results['errors'] += 1
-        
-        # Run multiple workers concurrently
-        start_time = time.time()
+                counts['errors'] += 1
+            finally:
+                await monitor.aclose()
+            return counts
         
-        with ThreadPoolExecutor(max_workers=6) as executor:
-            futures = [
-                executor.submit(auth_worker),
-                executor.submit(auth_worker),
-                executor.submit(message_worker),
-                executor.submit(message_worker),
-                executor.submit(processing_worker),
-                executor.submit(processing_worker)
-            ]
+        async def run_workers():
+            async with create_async_http_client() as http:
+                outcomes = await asyncio.gather(
+                    auth_worker(http),
+                    auth_worker(http),
+                    message_worker(http),
+                    message_worker(http),
+                    processing_worker(),
+                    processing_worker(),
+                    return_exceptions=True
+                )
             
-            # Wait for all workers to complete
-            for future in as_completed(futures):
-                try:
-                    future.result()
-                except Exception as e:
+            for outcome in outcomes:
+                if isinstance(outcome, Exception):
                     results['errors'] += 1
-                    print(f"Worker error: {e}")
+                    print(f"Worker error: {outcome}")
+                else:
+                    results.update(outcome)
+        
+        # Run multiple workers concurrently on one event loop
+        start_time = time.time()
+        asyncio.run(run_workers())
         
         duration = time.time() - start_time
         
@@ -9,6 +9,8 @@ This script demonstrates both upload methods:
 
 import os
 import time
+import shutil
+import uuid
 import requests
 import tempfile
 from pathlib import Path
@@ -17,19 +19,39 @@ from pathlib import Path
 BASE_URL = "http://localhost:8000"
 UPLOAD_DIR = Path("file_uploads")
 
-def create_test_file(filename: str, content: str) -> Path:
+# Test payloads, encoded once at import
+FOLDER_TEST_CONTENT = b"This is a test document for folder monitoring."
+API_TEST_CONTENT = b"This is a test document for API upload."
+
+def create_test_file(filename: str, content: bytes) -> Path:
     """Create a test file with the given content."""
     test_file = Path(tempfile.gettempdir()) / filename
-    test_file.write_text(content, encoding='utf-8')
+    test_file.write_bytes(content)
     return test_file
 
+def stream_multipart(field: str, path: Path, content_type: str, boundary: str, chunk_size: int = 64 * 1024):
+    """Yield a multipart/form-data body for one file, reading it in chunks.
+
+    Passed as ``data=`` to requests this is sent with chunked transfer
+    encoding, so upload memory stays constant regardless of file size.
+    """
+    yield (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="{field}"; filename="{path.name}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'
+    ).encode('utf-8')
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+    yield f'\r\n--{boundary}--\r\n'.encode('utf-8')
+
 def test_folder_monitoring():
     """Test file upload monitoring by copying files to upload directory."""
     print("🗂️  Testing Folder Monitoring")
     print("=" * 50)
     
     # Create test file
-    test_file = create_test_file("test_document.txt", "This is a test document for folder monitoring.")
+    test_file = create_test_file("test_document.txt", FOLDER_TEST_CONTENT)
     print(f"Created test file: {test_file}")
     
     # Copy to upload directory
@@ -38,7 +60,8 @@ def test_folder_monitoring():
         print(f"Created upload directory: {UPLOAD_DIR}")
     
     dest_file = UPLOAD_DIR / test_file.name
-    dest_file.write_bytes(test_file.read_bytes())
+    # copyfile lets the kernel copy the data (copy_file_range/sendfile on Linux)
+    shutil.copyfile(test_file, dest_file)
     print(f"Copied file to upload directory: {dest_file}")
     
     # Wait for processing
@@ -66,14 +89,18 @@ def test_api_upload():
     print("=" * 50)
     
     # Create test file
-    test_file = create_test_file("api_test.txt", "This is a test document for API upload.")
+    test_file = create_test_file("api_test.txt", API_TEST_CONTENT)
     print(f"Created test file: {test_file}")
     
     try:
-        # Upload via API
-        with open(test_file, 'rb') as f:
-            files = {'file': (test_file.name, f, 'text/plain')}
-            response = requests.post(f"{BASE_URL}/upload-file", files=files, timeout=10)
+        # Upload via API, streaming the multipart body instead of buffering it
+        boundary = uuid.uuid4().hex
+        response = requests.post(
+            f"{BASE_URL}/upload-file",
+            data=stream_multipart('file', test_file, 'text/plain', boundary),
+            headers={'Content-Type': f'multipart/form-data; boundary={boundary}'},
+            timeout=60
+        )
         
         if response.status_code == 200:
             result = response.json()
@@ -0,0 +1,37 @@
+"""
+Shared pytest fixtures for the Email Monitor test suite.
+
+The fakeredis server/pool are session-scoped, and async tests are marked
+asyncio(loop_scope="session"), so they reuse one loop and one Redis
+connection pool instead of building them per test. Loops are uvloop loops
+when uvloop is installed, matching the worker entrypoints.
+"""
+
+import asyncio
+
+import fakeredis
+import pytest
+import redis
+
+try:
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
+
+@pytest.fixture(scope="session")
+def fake_redis_server():
+    """In-process Redis server shared by sync and async clients"""
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture(scope="session")
+def redis_pool(fake_redis_server):
+    """Connection pool onto the shared fakeredis server"""
+    pool = redis.ConnectionPool(
+        connection_class=fakeredis.FakeConnection,
+        server=fake_redis_server
+    )
+    yield pool
+    pool.disconnect()
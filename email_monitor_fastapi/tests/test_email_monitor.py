@@ -29,11 +29,12 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
 import redis
+import fakeredis
 
 # Import modules to test
-from app.redis_queue import RedisEmailQueue, EmailAttachmentData
+from app.redis_queue import RedisEmailQueue, EmailAttachmentData, encode_queue_item, decode_queue_item, parse_queue_item, pop_queue_batch, apop_queue_batch
 from attachment_worker import AttachmentWorker
-from worker_runner import WorkerManager, FastAPIWorkerManager
+from worker_runner import WorkerManager, AsyncWorkerManager, FastAPIWorkerManager
 
 
 class TestEmailAttachmentData:
@@ -89,28 +90,75 @@ class TestEmailAttachmentData:
         restored_data = EmailAttachmentData.from_dict(data_dict)
         assert restored_data.attachment_content == content
         assert restored_data.task_id == data.task_id
+    
+    def test_queue_item_round_trip(self):
+        """Test encoding for Redis and decoding back"""
+        content = b"\x00\x01binary attachment content"
+        data = EmailAttachmentData(
+            task_id="test_123",
+            email_id="email_456",
+            email_subject="Test Subject",
+            email_sender="John Doe",
+            email_sender_email="john@example.com",
+            email_content="Test email content",
+            email_received_date="2023-01-01T10:00:00Z",
+            attachment_id="attach_789",
+            attachment_filename="test.pdf",
+            attachment_content=content,
+            attachment_mime_type="application/pdf",
+            attachment_size=len(content)
+        )
+        
+        raw = encode_queue_item(data)
+        
+        assert isinstance(raw, bytes)
+        assert EmailAttachmentData.from_dict(decode_queue_item(raw)) == data
+        assert parse_queue_item(raw) == data
+        
+        # Legacy JSON items still decode
+        legacy = json.dumps(data.to_dict()).encode('utf-8')
+        assert EmailAttachmentData.from_dict(decode_queue_item(legacy)) == data
+        assert parse_queue_item(legacy) == data
+    
+    def test_compressed_roundtrip(self):
+        """Test that large attachments are zstd-compressed and restored"""
+        pytest.importorskip("zstandard")
+        content = b"col_a,col_b,col_c\n" * 10000  # ~170KB of compressible CSV
+        data = EmailAttachmentData(
+            task_id="test_123",
+            email_id="email_456",
+            email_subject="Test Subject",
+            email_sender="John Doe",
+            email_sender_email="john@example.com",
+            email_content="Test email content",
+            email_received_date="2023-01-01T10:00:00Z",
+            attachment_id="attach_789",
+            attachment_filename="data.csv",
+            attachment_content=content,
+            attachment_mime_type="text/csv",
+            attachment_size=len(content)
+        )
+        
+        data_dict = data.to_dict()
+        assert data_dict["compressed"] is True
+        assert len(data_dict["attachment_content_b64"]) < len(content)
+        assert EmailAttachmentData.from_dict(data_dict) == data
+        
+        raw = encode_queue_item(data)
+        assert len(raw) < len(content)
+        assert EmailAttachmentData.from_dict(decode_queue_item(raw)) == data
 
 
 class TestRedisEmailQueue:
     """Test Redis queue operations"""
     
     @pytest.fixture
-    def mock_redis(self):
-        """Mock Redis client"""
-        with patch('app.redis_queue.redis.Redis') as mock_redis_class:
-            mock_client = Mock()
-            mock_client.ping.return_value = True
-            mock_client.llen.return_value = 0
-            mock_client.lpush.return_value = 1
-            mock_client.info.return_value = {
-                'redis_version': '6.0.0',
-                'used_memory': 1024,
-                'used_memory_human': '1K',
-                'connected_clients': 1,
-                'total_commands_processed': 100
-            }
-            mock_redis_class.return_value = mock_client
-            yield mock_client
+    def mock_redis(self, redis_pool, monkeypatch):
+        """fakeredis client returned in place of redis.Redis"""
+        fake = redis.Redis(connection_pool=redis_pool)
+        fake.flushall()
+        monkeypatch.setattr('app.redis_queue.redis.Redis', lambda *args, **kwargs: fake)
+        yield fake
     
     def test_redis_queue_initialization(self, mock_redis):
         """Test Redis queue initialization"""
@@ -122,7 +170,7 @@ class TestRedisEmailQueue:
             queue = RedisEmailQueue()
             assert queue.queue_name == 'test_queue'
             assert queue.redis_host == 'localhost'
-            mock_redis.ping.assert_called_once()
+            assert queue.redis_client is mock_redis
     
     def test_enqueue_attachment(self, mock_redis):
         """Test enqueuing an attachment"""
@@ -147,7 +195,60 @@ class TestRedisEmailQueue:
             result = queue.enqueue_attachment(attachment_data)
             
             assert result is True
-            mock_redis.lpush.assert_called_once()
+            assert mock_redis.llen(queue.queue_name) == 1
+    
+    def test_enqueue_batch(self, mock_redis):
+        """Test enqueuing several attachments in one pipeline"""
+        queue = RedisEmailQueue()
+        attachments = [
+            EmailAttachmentData(
+                task_id=f"task_{i}",
+                email_id="email_456",
+                email_subject="Test Subject",
+                email_sender="John Doe",
+                email_sender_email="john@example.com",
+                email_content="Test email content",
+                email_received_date="2023-01-01T10:00:00Z",
+                attachment_id=f"attach_{i}",
+                attachment_filename="test.pdf",
+                attachment_content=b"small content",
+                attachment_mime_type="application/pdf",
+                attachment_size=13
+            )
+            for i in range(3)
+        ]
+        
+        results = queue.enqueue_attachments(attachments)
+        
+        assert results == [True, True, True]
+        assert mock_redis.llen(queue.queue_name) == 3
+    
+    def test_enqueue_batch_respects_queue_limit(self, mock_redis):
+        """Test that a batch only fills the queue up to MAX_QUEUE_SIZE"""
+        with patch.dict(os.environ, {'MAX_QUEUE_SIZE': '2'}):
+            queue = RedisEmailQueue()
+            attachments = [
+                EmailAttachmentData(
+                    task_id=f"task_{i}",
+                    email_id="email_456",
+                    email_subject="Test Subject",
+                    email_sender="John Doe",
+                    email_sender_email="john@example.com",
+                    email_content="Test email content",
+                    email_received_date="2023-01-01T10:00:00Z",
+                    attachment_id=f"attach_{i}",
+                    attachment_filename="test.pdf",
+                    attachment_content=b"small content",
+                    attachment_mime_type="application/pdf",
+                    attachment_size=13
+                )
+                for i in range(3)
+            ]
+            
+            results = queue.enqueue_attachments(attachments)
+            
+            assert results == [True, True, False]
+            assert mock_redis.llen(queue.queue_name) == 2
     
     def test_enqueue_large_attachment_rejected(self, mock_redis):
         """Test that large attachments are rejected"""
@@ -172,7 +273,7 @@ class TestRedisEmailQueue:
             result = queue.enqueue_attachment(attachment_data)
             
             assert result is False
-            mock_redis.lpush.assert_not_called()
+            assert mock_redis.llen(queue.queue_name) == 0
     
     def test_queue_info(self, mock_redis):
         """Test getting queue information"""
@@ -182,8 +283,103 @@ class TestRedisEmailQueue:
         assert "queue_name" in info
         assert "queue_length" in info
         assert "redis_info" in info
-        mock_redis.llen.assert_called()
-        mock_redis.info.assert_called()
+        assert info["queue_length"] == 0
+        
+        # fakeredis has no INFO command; that is reported without losing the length
+        assert "error" in info["redis_info"]
+        
+        # A server that answers INFO fills in the Redis details
+        info = queue._queue_info({'redis_version': '7.2.0', 'connected_clients': 1}, 3)
+        assert info["queue_length"] == 3
+        assert info["redis_info"]["redis_version"] == '7.2.0'
+    
+    def test_dequeue_batch(self, mock_redis):
+        """Test popping several attachments in one BLMPOP call"""
+        queue = RedisEmailQueue()
+        for i in range(3):
+            mock_redis.lpush(queue.queue_name, encode_queue_item(EmailAttachmentData(
+                task_id=f"task_{i}",
+                email_id="email_456",
+                email_subject="Test Subject",
+                email_sender="John Doe",
+                email_sender_email="john@example.com",
+                email_content="Test email content",
+                email_received_date="2023-01-01T10:00:00Z",
+                attachment_id=f"attach_{i}",
+                attachment_filename="test.pdf",
+                attachment_content=b"content",
+                attachment_mime_type="application/pdf",
+                attachment_size=7
+            )))
+        
+        batch = queue.dequeue_batch(count=3, timeout=1)
+        
+        assert [a.task_id for a in batch] == ["task_0", "task_1", "task_2"]
+        assert mock_redis.llen(queue.queue_name) == 0
+        
+        # Timeout returns an empty batch
+        assert queue.dequeue_batch(timeout=1) == []
+    
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_async_pop_batch(self, mock_redis, fake_redis_server):
+        """Test popping a batch with a redis.asyncio client"""
+        mock_redis.lpush("queue", b"first", b"second")
+        client = fakeredis.aioredis.FakeRedis(server=fake_redis_server)
+        
+        assert await apop_queue_batch(client, "queue", 4, 1) == [b"first", b"second"]
+        assert await apop_queue_batch(client, "queue", 4, 1) == []
+    
+    def test_pop_batch_falls_back_without_blmpop(self):
+        """Test that a server without BLMPOP is detected once and BRPOP is used after"""
+        client = Mock()
+        client.execute_command.side_effect = redis.exceptions.ResponseError("unknown command 'BLMPOP'")
+        client.brpop.return_value = (b"queue", b"item")
+        
+        assert pop_queue_batch(client, "queue", 4, 1) == [b"item"]
+        assert pop_queue_batch(client, "queue", 4, 1) == [b"item"]
+        assert client.execute_command.call_count == 1
+        
+        # Other server errors are not mistaken for a missing command
+        client = Mock()
+        client.execute_command.side_effect = redis.exceptions.ResponseError("WRONGTYPE Operation against a key")
+        with pytest.raises(redis.exceptions.ResponseError):
+            pop_queue_batch(client, "queue", 4, 1)
+        client.brpop.assert_not_called()
+    
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_async_queue_operations(self, mock_redis, fake_redis_server):
+        """Test the redis.asyncio methods against fakeredis"""
+        queue = RedisEmailQueue()
+        queue.aredis = fakeredis.aioredis.FakeRedis(server=fake_redis_server)
+        
+        attachment_data = EmailAttachmentData(
+            task_id="test_123",
+            email_id="email_456",
+            email_subject="Test Subject",
+            email_sender="John Doe",
+            email_sender_email="john@example.com",
+            email_content="Test email content",
+            email_received_date="2023-01-01T10:00:00Z",
+            attachment_id="attach_789",
+            attachment_filename="test.pdf",
+            attachment_content=b"small content",
+            attachment_mime_type="application/pdf",
+            attachment_size=13
+        )
+        
+        assert await queue.aenqueue_attachment(attachment_data) is True
+        
+        info = await queue.aget_queue_info()
+        assert info["queue_length"] == 1
+        # The fake has no INFO; only the Redis details are missing
+        assert "error" in info["redis_info"]
+        
+        items = await queue.apeek_queue(1)
+        assert items[0]["task_id"] == "test_123"
+        assert mock_redis.llen(queue.queue_name) == 1
+        
+        await queue.aclose()
+        assert queue.aredis is None
     
     def test_peek_queue(self, mock_redis):
         """Test peeking at queue items"""
@@ -193,29 +389,27 @@ class TestRedisEmailQueue:
             "attachment_filename": "test.pdf",
             "attachment_content_b64": "dGVzdA=="  # base64 for "test"
         })
-        mock_redis.lrange.return_value = [mock_item.encode()]
-        
         queue = RedisEmailQueue()
+        mock_redis.lpush(queue.queue_name, mock_item.encode())
+        
         items = queue.peek_queue(1)
         
         assert len(items) == 1
         assert items[0]["task_id"] == "test_123"
         assert "attachment_content_b64" in items[0]
-        mock_redis.lrange.assert_called_once()
+        assert mock_redis.llen(queue.queue_name) == 1
 
 
 class TestAttachmentWorker:
     """Test attachment worker functionality"""
     
     @pytest.fixture
-    def mock_redis_client(self):
-        """Mock Redis client for worker"""
-        with patch('attachment_worker.redis.Redis') as mock_redis_class:
-            mock_client = Mock()
-            mock_client.ping.return_value = True
-            mock_client.brpop.return_value = None  # Default no items
-            mock_redis_class.return_value = mock_client
-            yield mock_client
+    def mock_redis_client(self, redis_pool, monkeypatch):
+        """fakeredis pool installed as the worker's shared connection pool"""
+        monkeypatch.setattr('attachment_worker._pool', redis_pool)
+        fake = redis.Redis(connection_pool=redis_pool)
+        fake.flushall()
+        yield fake
     
     @pytest.fixture
     def temp_dir(self):
@@ -235,7 +429,7 @@ class TestAttachmentWorker:
             assert worker.app_name == 'TEST_APP'
             assert worker.user_id == 'test_user'
             assert worker.temp_dir == temp_dir
-            mock_redis_client.ping.assert_called_once()
+            assert worker.redis_client.connection_pool is mock_redis_client.connection_pool
     
     def test_parse_queue_item(self, mock_redis_client, temp_dir):
         """Test parsing queue items"""
@@ -268,7 +462,37 @@ class TestAttachmentWorker:
             assert parsed_data.email_subject == "Test Subject"
             assert parsed_data.attachment_content == b"test content"
     
-    @pytest.mark.asyncio
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_worker_recycles_after_max_tasks(self, mock_redis_client, temp_dir):
+        """Test that the run loop exits once WORKER_MAX_TASKS items are processed"""
+        with patch.dict(os.environ, {'WORKER_TEMP_DIR': str(temp_dir), 'WORKER_MAX_TASKS': '2'}):
+            worker = AttachmentWorker()
+        
+        async def handle(raw_data):
+            worker._update_stats(True)
+        
+        with patch('attachment_worker.pop_queue_batch', return_value=[b"a", b"b"]), \
+             patch.object(worker, '_handle_queue_item', side_effect=handle):
+            await asyncio.wait_for(worker.run(), timeout=5)
+        
+        assert worker.stats['processed_count'] == 2
+    
+    def test_worker_totals_from_shared_counters(self, mock_redis_client, temp_dir):
+        """Test that worker outcomes reach the manager's shared counters"""
+        manager = AsyncWorkerManager(num_workers=1)
+        with patch.dict(os.environ, {'WORKER_TEMP_DIR': str(temp_dir)}):
+            worker = AttachmentWorker(shared_counters=manager.counters)
+        
+        worker._update_stats(True)
+        worker._update_stats(False)
+        
+        assert manager.get_stats()["worker_totals"] == {
+            "processed_count": 2,
+            "success_count": 1,
+            "error_count": 1
+        }
+    
+    @pytest.mark.asyncio(loop_scope="session")
     async def test_save_temp_attachment(self, mock_redis_client, temp_dir):
         """Test saving attachment to temporary file"""
         with patch.dict(os.environ, {'WORKER_TEMP_DIR': str(temp_dir)}):
@@ -296,7 +520,7 @@ class TestAttachmentWorker:
             assert temp_file.read_bytes() == b"test file content"
             assert temp_file.suffix == ".pdf"
     
-    @pytest.mark.asyncio
+    @pytest.mark.asyncio(loop_scope="session")
     async def test_prepare_pipeline_input(self, mock_redis_client, temp_dir):
         """Test preparing input for pipeline"""
         with patch.dict(os.environ, {
@@ -343,6 +567,8 @@ class TestAttachmentWorker:
             assert attachment_info["mime_type"] == "image/jpeg"
             assert attachment_info["size"] == 18
             assert attachment_info["content_bytes"] == b"fake image content"
+            # The in-memory content is passed through, not re-read from disk
+            assert attachment_info["content_bytes"] is attachment_data.attachment_content
 
 
 class TestWorkerManager:
@@ -350,12 +576,12 @@ class TestWorkerManager:
     
     @pytest.fixture
     def mock_process(self):
-        """Mock multiprocessing.Process"""
-        with patch('worker_runner.mp.Process') as mock_process_class:
+        """Mock the worker multiprocessing context's Process"""
+        with patch('worker_runner._create_mp_context') as mock_context:
             mock_process = Mock()
             mock_process.pid = 12345
             mock_process.is_alive.return_value = True
-            mock_process_class.return_value = mock_process
+            mock_context.return_value.Process.return_value = mock_process
             yield mock_process
     
     def test_worker_manager_init(self):
@@ -366,7 +592,7 @@ class TestWorkerManager:
             assert len(manager.workers) == 0
             assert manager.running is False
     
-    @pytest.mark.asyncio
+    @pytest.mark.asyncio(loop_scope="session")
     async def test_start_workers(self, mock_process):
         """Test starting worker processes"""
         manager = WorkerManager(num_workers=2)
@@ -378,7 +604,7 @@ class TestWorkerManager:
         assert manager.stats['workers_started'] == 2
         assert mock_process.start.call_count == 2
     
-    @pytest.mark.asyncio
+    @pytest.mark.asyncio(loop_scope="session")
     async def test_stop_workers(self, mock_process):
         """Test stopping worker processes"""
         manager = WorkerManager(num_workers=1)
@@ -395,6 +621,18 @@ class TestWorkerManager:
         mock_process.terminate.assert_called_once()
         mock_process.join.assert_called()
     
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_restart_workers(self, mock_process):
+        """Test respawning several dead workers in one pass"""
+        manager = WorkerManager(num_workers=3)
+        await manager.start_workers()
+        
+        await manager._restart_workers([0, 2])
+        
+        assert manager.stats['restarts'] == 2
+        assert manager.stats['workers_started'] == 3
+        assert mock_process.start.call_count == 5
+    
     def test_get_stats(self, mock_process):
         """Test getting worker statistics"""
         manager = WorkerManager(num_workers=2)
@@ -408,7 +646,7 @@ class TestWorkerManager:
         assert stats["num_workers_configured"] == 2
         assert stats["active_workers"] == 2  # Both are alive
     
-    @pytest.mark.asyncio
+    @pytest.mark.asyncio(loop_scope="session")
     async def test_health_check(self, mock_process):
         """Test worker health check"""
         manager = WorkerManager(num_workers=1)
@@ -423,6 +661,55 @@ class TestWorkerManager:
         assert health["workers_running"] == 1
 
 
+class TestAsyncWorkerManager:
+    """Test in-process asyncio worker management"""
+    
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_workers_share_one_redis_client(self):
+        """Test that task workers share one async client and stop on cancel"""
+        async def run_forever():
+            await asyncio.Event().wait()
+        
+        with patch('attachment_worker.create_async_redis_client') as mock_create, \
+             patch('attachment_worker.AttachmentWorker') as mock_worker_class:
+            mock_worker_class.return_value.run = AsyncMock(side_effect=run_forever)
+            mock_create.return_value.close = AsyncMock()
+            
+            manager = AsyncWorkerManager(num_workers=3)
+            await manager.start_workers()
+            await asyncio.sleep(0)
+            
+            assert manager.get_stats()["active_workers"] == 3
+            mock_create.assert_called_once()
+            for call in mock_worker_class.call_args_list:
+                assert call.kwargs["redis_client"] is mock_create.return_value
+                assert call.kwargs["max_tasks"] == 0
+            
+            tasks = list(manager.tasks)
+            await manager.stop_workers()
+            
+            assert all(task.cancelled() for task in tasks)
+            assert manager.tasks == []
+            assert manager.stats["workers_stopped"] == 3
+            mock_create.return_value.close.assert_awaited_once()
+    
+    def test_fastapi_manager_mode(self):
+        """Test that workers default to asyncio tasks, with process mode opt-in"""
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop('WORKER_MODE', None)
+            assert isinstance(FastAPIWorkerManager(num_workers=1).worker_manager, AsyncWorkerManager)
+        
+        manager = FastAPIWorkerManager(num_workers=1, mode="process")
+        assert isinstance(manager.worker_manager, WorkerManager)
+    
+    @pytest.mark.asyncio(loop_scope="session")
+    async def test_event_loop_uses_uvloop(self):
+        """Test that async tests run on uvloop when it is installed"""
+        uvloop = pytest.importorskip("uvloop")
+        assert isinstance(asyncio.get_event_loop_policy(), uvloop.EventLoopPolicy)
+        assert isinstance(asyncio.get_running_loop(), uvloop.Loop)
+
+
 class TestFastAPIIntegration:
     """Test FastAPI endpoints and integration"""
     
@@ -561,7 +848,7 @@ class TestErrorHandling:
             result = worker._parse_queue_item(incomplete_data.encode())
             assert result is None
     
-    @pytest.mark.asyncio
+    @pytest.mark.asyncio(loop_scope="session")
     async def test_worker_process_attachment_failure(self):
         """Test worker handling of attachment processing failures"""
         with patch('attachment_worker.redis.Redis'):
@@ -592,21 +879,21 @@ class TestErrorHandling:
 class TestIntegrationScenarios:
     """Test complete integration scenarios"""
     
-    @pytest.mark.asyncio
+    @pytest.mark.asyncio(loop_scope="session")
     async def test_complete_email_processing_workflow(self):
         """Test complete workflow from email to worker processing"""
         # This would be a comprehensive integration test
         # covering email ingestion -> queue -> worker processing
         pass
     
-    @pytest.mark.asyncio 
+    @pytest.mark.asyncio(loop_scope="session") 
     async def test_worker_restart_scenario(self):
         """Test worker restart and recovery scenarios"""
-        with patch('worker_runner.mp.Process') as mock_process_class:
+        with patch('worker_runner._create_mp_context') as mock_context:
             mock_process = Mock()
             mock_process.pid = 12345
             mock_process.is_alive.return_value = True
-            mock_process_class.return_value = mock_process
+            mock_context.return_value.Process.return_value = mock_process
             
             manager = WorkerManager(num_workers=1)
             
@@ -624,14 +911,11 @@ class TestIntegrationScenarios:
     
     def test_redis_queue_full_scenario(self):
         """Test behavior when Redis queue is full"""
-        with patch('app.redis_queue.redis.Redis') as mock_redis_class:
-            mock_client = Mock()
-            mock_client.ping.return_value = True
-            mock_client.llen.return_value = 1000  # Queue is full
-            mock_redis_class.return_value = mock_client
-            
+        fake = fakeredis.FakeStrictRedis(server=fakeredis.FakeServer())
+        with patch('app.redis_queue.redis.Redis', return_value=fake):
             with patch.dict(os.environ, {'MAX_QUEUE_SIZE': '1000'}):
                 queue = RedisEmailQueue()
+                fake.lpush(queue.queue_name, *[b"item"] * 1000)  # Queue is full
                 
                 attachment_data = EmailAttachmentData(
                     task_id="test_123",
@@ -650,6 +934,7 @@ class TestIntegrationScenarios:
                 
                 result = queue.enqueue_attachment(attachment_data)
                 assert result is False  # Should reject when queue is full
+                assert fake.llen(queue.queue_name) == 1000
 
 
 if __name__ == "__main__":
@@ -11,7 +11,9 @@ import sys
 import asyncio
 import logging
 import signal
+import time
 import multiprocessing as mp
+import multiprocessing.connection as mp_connection
 from pathlib import Path
 from typing import List, Dict, Any
 from datetime import datetime
@@ -25,6 +27,77 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _create_mp_context():
+    """
+    Multiprocessing context for worker processes
+    
+    WORKER_START_METHOD picks the start method. By default a forkserver with
+    attachment_worker preloaded is used where available, so each new worker
+    is forked from an interpreter that has already imported it instead of
+    starting (and importing everything) from scratch. 'fork' imports
+    attachment_worker in this process and shares it copy-on-write, which is
+    cheapest but only safe when the parent has no other threads running.
+    The managers monitor and join workers through asyncio.to_thread, so
+    fork is opt-in only; 'spawn' is the fallback (and the only option on
+    Windows).
+    """
+    available = mp.get_all_start_methods()
+    default = 'forkserver' if 'forkserver' in available else 'spawn'
+    method = os.getenv('WORKER_START_METHOD', default)
+    if method not in available:
+        logger.warning(f"Start method '{method}' not available here, using '{default}'")
+        method = default
+    
+    ctx = mp.get_context(method)
+    if method == 'forkserver':
+        ctx.set_forkserver_preload(['attachment_worker'])
+    elif method == 'fork':
+        import attachment_worker  # noqa: F401 - inherited by children, not re-imported
+    return ctx
+
+
+# Per-worker counters aggregated across all workers (names match AttachmentWorker.stats)
+WORKER_COUNTERS = ('processed_count', 'success_count', 'error_count')
+
+
+def _create_counters(ctx=mp) -> Dict[str, Any]:
+    """Shared-memory counters that workers increment and get_stats reads directly"""
+    return {name: ctx.Value('Q', 0) for name in WORKER_COUNTERS}
+
+
+def _run_worker_process(worker_id: str, shared_counters: Dict[str, Any] = None):
+    """
+    Target function for worker process
+    
+    Module-level so it can be pickled for forkserver/spawn children.
+    Sets up the worker identity, event loop policy and Redis connection
+    pool once, then runs the worker until it exits.
+    """
+    try:
+        # A forked child inherits the parent's event-loop signal handling;
+        # restore the defaults so terminate() (SIGTERM) stops this worker
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        
+        # Set worker-specific environment
+        os.environ['PIPELINE_USER_ID'] = worker_id
+        
+        # Already imported in the forkserver when preloading succeeded
+        from attachment_worker import main, install_event_loop_policy, get_connection_pool
+        
+        install_event_loop_policy()
+        get_connection_pool()
+        
+        # Run the async main function
+        asyncio.run(main(shared_counters))
+        
+    except Exception as e:
+        logger.error(f"Worker process {worker_id} failed: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+
+
 class WorkerManager:
     """
     Manages multiple attachment worker processes
@@ -34,9 +107,13 @@ class WorkerManager:
         """Initialize the worker manager"""
         self.num_workers = num_workers or int(os.getenv('MAX_CONCURRENT_WORKERS', '1'))
         self.workers: List[mp.Process] = []
+        self.mp_context = _create_mp_context()
+        self.counters = _create_counters(self.mp_context)
         self.running = False
         
-        # Statistics
+        # Statistics; uptime comes from the monotonic clock so get_stats
+        # doesn't build datetimes per call
+        self._started_ns = time.monotonic_ns()
         self.stats = {
             'manager_started_at': datetime.now().isoformat(),
             'workers_started': 0,
@@ -46,6 +123,16 @@ class WorkerManager:
         
         logger.info(f"WorkerManager initialized with {self.num_workers} workers")
     
+    def _spawn_worker(self, index: int) -> mp.Process:
+        """Create and start the worker process for slot index"""
+        worker = self.mp_context.Process(
+            target=_run_worker_process,
+            args=(f"worker_{index+1}", self.counters),
+            name=f"AttachmentWorker_{index+1}"
+        )
+        worker.start()
+        return worker
+    
     async def start_workers(self):
         """Start all worker processes"""
         if self.running:
@@ -58,14 +145,7 @@ class WorkerManager:
         
         for i in range(self.num_workers):
             try:
-                # Create worker process
-                worker = mp.Process(
-                    target=self._run_worker_process,
-                    args=(f"worker_{i+1}",),
-                    name=f"AttachmentWorker_{i+1}"
-                )
-                
-                worker.start()
+                worker = self._spawn_worker(i)
                 self.workers.append(worker)
                 self.stats['workers_started'] += 1
                 
@@ -91,93 +171,96 @@ class WorkerManager:
                 logger.info(f"Terminating worker {i+1} (PID: {worker.pid})")
                 worker.terminate()
         
-        # Wait for graceful shutdown
-        shutdown_timeout = 30  # seconds
-        for i, worker in enumerate(self.workers):
-            try:
-                worker.join(timeout=shutdown_timeout)
-                if worker.is_alive():
-                    logger.warning(f"Force killing worker {i+1} (PID: {worker.pid})")
-                    worker.kill()
-                    worker.join()
-                
-                self.stats['workers_stopped'] += 1
-                logger.info(f"Worker {i+1} stopped")
-                
-            except Exception as e:
-                logger.error(f"Error stopping worker {i+1}: {e}")
+        # Wait for graceful shutdown of all workers at once, so the timeout
+        # bounds the whole shutdown rather than applying per worker
+        await asyncio.gather(*(
+            asyncio.to_thread(self._join_worker, i, worker)
+            for i, worker in enumerate(self.workers)
+        ))
         
         self.workers.clear()
         logger.info("All workers stopped")
     
-    def _run_worker_process(self, worker_id: str):
-        """
-        Target function for worker process
-        
-        This runs in a separate process and imports the worker module
-        to avoid issues with multiprocessing and asyncio.
-        """
+    def _join_worker(self, index: int, worker: mp.Process, shutdown_timeout: int = 30):
+        """Wait for a terminated worker to exit, killing it after shutdown_timeout seconds"""
         try:
-            # Set worker-specific environment
-            os.environ['PIPELINE_USER_ID'] = worker_id
-            
-            # Import and run the worker (done in subprocess to avoid import issues)
-            from attachment_worker import main
+            worker.join(timeout=shutdown_timeout)
+            if worker.is_alive():
+                logger.warning(f"Force killing worker {index+1} (PID: {worker.pid})")
+                worker.kill()
+                worker.join()
             
-            # Run the async main function
-            asyncio.run(main())
+            self.stats['workers_stopped'] += 1
+            logger.info(f"Worker {index+1} stopped")
             
         except Exception as e:
-            logger.error(f"Worker process {worker_id} failed: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.error(f"Error stopping worker {index+1}: {e}")
+    
+    async def _restart_workers(self, indices: List[int]):
+        """Respawn the workers in the given slots, concurrently where safe"""
+        for worker_idx in indices:
+            logger.info(f"Restarting worker {worker_idx+1}")
+        
+        if self.mp_context.get_start_method() == 'fork':
+            # fork() itself is fast, and forking from helper threads is unsafe
+            results = []
+            for worker_idx in indices:
+                try:
+                    results.append(self._spawn_worker(worker_idx))
+                except Exception as e:
+                    results.append(e)
+        else:
+            # forkserver/spawn starts wait on the new child; overlap them
+            results = await asyncio.gather(
+                *(asyncio.to_thread(self._spawn_worker, worker_idx) for worker_idx in indices),
+                return_exceptions=True
+            )
+        
+        for worker_idx, result in zip(indices, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to restart worker {worker_idx+1}: {result}")
+                continue
+            self.workers[worker_idx] = result
+            self.stats['restarts'] += 1
+            logger.info(f"Restarted worker {worker_idx+1} (new PID: {result.pid})")
     
     async def monitor_workers(self):
-        """Monitor worker health and restart if needed"""
+        """Restart workers as soon as they exit"""
         while self.running:
-            dead_workers = []
+            if not self.workers:
+                await asyncio.sleep(30)
+                continue
             
-            for i, worker in enumerate(self.workers):
-                if not worker.is_alive():
-                    logger.warning(f"Worker {i+1} (PID: {worker.pid}) is dead")
-                    dead_workers.append(i)
+            # Block (off the event loop) until a worker's sentinel becomes ready,
+            # i.e. it exited; the timeout lets the loop notice stop_workers
+            sentinels = {worker.sentinel: i for i, worker in enumerate(self.workers)}
+            ready = await asyncio.to_thread(mp_connection.wait, list(sentinels), 30)
+            if not self.running:
+                break
             
-            # Restart dead workers
-            for worker_idx in reversed(dead_workers):  # Reverse to maintain indices
-                old_worker = self.workers[worker_idx]
-                logger.info(f"Restarting worker {worker_idx+1}")
-                
-                try:
-                    # Create new worker
-                    new_worker = mp.Process(
-                        target=self._run_worker_process,
-                        args=(f"worker_{worker_idx+1}",),
-                        name=f"AttachmentWorker_{worker_idx+1}"
-                    )
-                    
-                    new_worker.start()
-                    self.workers[worker_idx] = new_worker
-                    self.stats['restarts'] += 1
-                    
-                    logger.info(f"Restarted worker {worker_idx+1} (new PID: {new_worker.pid})")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to restart worker {worker_idx+1}: {e}")
+            dead_workers = sorted(sentinels[sentinel] for sentinel in ready)
+            for i in dead_workers:
+                logger.warning(f"Worker {i+1} (PID: {self.workers[i].pid}) is dead")
             
-            # Wait before next check
-            await asyncio.sleep(30)  # Check every 30 seconds
+            if dead_workers:
+                await self._restart_workers(dead_workers)
+                # Throttle workers that crash straight away
+                await asyncio.sleep(1)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get worker manager statistics"""
-        active_workers = sum(1 for w in self.workers if w.is_alive())
+        # is_alive() is a waitpid syscall; check each worker once
+        worker_pids = [w.pid for w in self.workers if w.is_alive()]
         
         return {
             **self.stats,
             'num_workers_configured': self.num_workers,
-            'active_workers': active_workers,
+            'active_workers': len(worker_pids),
             'total_workers': len(self.workers),
             'running': self.running,
-            'worker_pids': [w.pid for w in self.workers if w.is_alive()]
+            'worker_pids': worker_pids,
+            'worker_totals': {name: counter.value for name, counter in self.counters.items()},
+            'uptime_s': (time.monotonic_ns() - self._started_ns) // 10**9
         }
     
     async def health_check(self) -> Dict[str, Any]:
@@ -191,14 +274,15 @@ class WorkerManager:
         }
         
         for i, worker in enumerate(self.workers):
+            alive = worker.is_alive()
             worker_info = {
                 'worker_id': i + 1,
-                'pid': worker.pid if worker.is_alive() else None,
-                'alive': worker.is_alive(),
+                'pid': worker.pid if alive else None,
+                'alive': alive,
                 'name': worker.name
             }
             
-            if worker.is_alive():
+            if alive:
                 health['workers_running'] += 1
                 health['workers_healthy'] += 1  # Basic health check
             
@@ -207,13 +291,177 @@ class WorkerManager:
         return health
 
 
+class AsyncWorkerManager:
+    """
+    Runs attachment workers as asyncio tasks in the current process
+    
+    The workload is I/O bound, so one interpreter and a single redis.asyncio
+    client (one connection pool) shared by every worker replace N child
+    processes each with its own connection. Blocking pops wait on the event
+    loop rather than holding a thread each. Exposes the same interface as
+    WorkerManager.
+    
+    Pipeline code itself runs on the app's event loop; CPU-heavy pipelines
+    should use WORKER_MODE=process.
+    """
+    
+    def __init__(self, num_workers: int = None):
+        """Initialize the worker manager"""
+        self.num_workers = num_workers or int(os.getenv('MAX_CONCURRENT_WORKERS', '1'))
+        self.tasks: List[asyncio.Task] = []
+        self.counters = _create_counters()
+        self.redis_client = None
+        self.running = False
+        
+        # Statistics; uptime comes from the monotonic clock so get_stats
+        # doesn't build datetimes per call
+        self._started_ns = time.monotonic_ns()
+        self.stats = {
+            'manager_started_at': datetime.now().isoformat(),
+            'workers_started': 0,
+            'workers_stopped': 0,
+            'restarts': 0
+        }
+        
+        logger.info(f"AsyncWorkerManager initialized with {self.num_workers} workers")
+    
+    def _start_task(self, index: int) -> asyncio.Task:
+        """Create the worker task for slot index, sharing the manager's Redis client"""
+        from attachment_worker import AttachmentWorker
+        
+        worker = AttachmentWorker(
+            redis_client=self.redis_client,
+            worker_id=f"worker_{index+1}",
+            shared_counters=self.counters,
+            # Tasks share the app's process, so restarting one frees nothing
+            max_tasks=0
+        )
+        return asyncio.create_task(worker.run(), name=f"AttachmentWorker_{index+1}")
+    
+    async def start_workers(self):
+        """Start all worker tasks"""
+        if self.running:
+            logger.warning("Workers already running")
+            return
+        
+        from attachment_worker import create_async_redis_client
+        
+        logger.info(f"Starting {self.num_workers} worker tasks...")
+        
+        self.redis_client = create_async_redis_client()
+        self.running = True
+        
+        for i in range(self.num_workers):
+            try:
+                self.tasks.append(self._start_task(i))
+                self.stats['workers_started'] += 1
+            except Exception as e:
+                logger.error(f"Failed to start worker {i+1}: {e}")
+        
+        logger.info(f"All {len(self.tasks)} workers started")
+    
+    async def stop_workers(self):
+        """Cancel all worker tasks and release the shared Redis client"""
+        if not self.running:
+            logger.warning("Workers not running")
+            return
+        
+        logger.info("Stopping all workers...")
+        self.running = False
+        
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.stats['workers_stopped'] += len(self.tasks)
+        self.tasks.clear()
+        
+        if self.redis_client is not None:
+            await self.redis_client.close()
+            self.redis_client = None
+        
+        logger.info("All workers stopped")
+    
+    async def monitor_workers(self):
+        """Restart worker tasks as soon as they exit"""
+        while self.running:
+            if not self.tasks:
+                await asyncio.sleep(30)
+                continue
+            
+            # The timeout lets the loop notice stop_workers
+            done, _ = await asyncio.wait(self.tasks, timeout=30, return_when=asyncio.FIRST_COMPLETED)
+            if not self.running:
+                break
+            
+            for i, task in enumerate(self.tasks):
+                if task in done:
+                    error = None if task.cancelled() else task.exception()
+                    logger.warning(f"Worker {i+1} task exited ({error!r}), restarting")
+                    try:
+                        self.tasks[i] = self._start_task(i)
+                        self.stats['restarts'] += 1
+                    except Exception as e:
+                        logger.error(f"Failed to restart worker {i+1}: {e}")
+            
+            if done:
+                # Throttle workers that crash straight away
+                await asyncio.sleep(1)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get worker manager statistics"""
+        active_workers = sum(1 for t in self.tasks if not t.done())
+        
+        return {
+            **self.stats,
+            'num_workers_configured': self.num_workers,
+            'active_workers': active_workers,
+            'total_workers': len(self.tasks),
+            'running': self.running,
+            'worker_pids': [os.getpid()] if active_workers else [],
+            'worker_totals': {name: counter.value for name, counter in self.counters.items()},
+            'uptime_s': (time.monotonic_ns() - self._started_ns) // 10**9
+        }
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """Perform health check on all workers"""
+        health = {
+            'manager_running': self.running,
+            'workers_configured': self.num_workers,
+            'workers_running': 0,
+            'workers_healthy': 0,
+            'worker_details': []
+        }
+        
+        for i, task in enumerate(self.tasks):
+            alive = not task.done()
+            health['worker_details'].append({
+                'worker_id': i + 1,
+                'pid': os.getpid() if alive else None,
+                'alive': alive,
+                'name': task.get_name()
+            })
+            
+            if alive:
+                health['workers_running'] += 1
+                health['workers_healthy'] += 1  # Basic health check
+        
+        return health
+
+
 class FastAPIWorkerManager:
     """
     Integration class for FastAPI lifespan management
     """
     
-    def __init__(self, num_workers: int = None):
-        self.worker_manager = WorkerManager(num_workers)
+    def __init__(self, num_workers: int = None, mode: str = None):
+        # Workers are I/O bound, so by default they run as tasks inside the app
+        # process; WORKER_MODE=process gives each its own process for CPU-heavy
+        # pipelines (OCR, PDF parsing)
+        mode = mode or os.getenv('WORKER_MODE', 'async')
+        if mode == 'process':
+            self.worker_manager = WorkerManager(num_workers)
+        else:
+            self.worker_manager = AsyncWorkerManager(num_workers)
         self.monitor_task = None
     
     async def startup(self):
@@ -298,20 +546,29 @@ async def standalone_runner():
     # Create worker manager
     manager = WorkerManager()
     
-    # Setup signal handlers for graceful shutdown
-    def signal_handler(signum, frame):
+    # Setup signal handlers for graceful shutdown; they only set an event,
+    # the shutdown itself runs below on the event loop
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+    
+    def signal_handler(signum, frame=None):
         logger.info(f"Received signal {signum}, shutting down...")
-        asyncio.create_task(manager.stop_workers())
+        loop.call_soon_threadsafe(stop_event.set)
     
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, signal_handler, sig)
+        except NotImplementedError:  # Windows
+            signal.signal(sig, signal_handler)
     
+    monitor = None
     try:
         # Start workers
         await manager.start_workers()
         
-        # Run monitoring loop
-        await manager.monitor_workers()
+        # Run monitoring loop until a shutdown signal arrives
+        monitor = asyncio.create_task(manager.monitor_workers())
+        await stop_event.wait()
         
     except KeyboardInterrupt:
         logger.info("Shutdown requested by user")
@@ -320,6 +577,9 @@ async def standalone_runner():
         import traceback
         logger.error(traceback.format_exc())
     finally:
+        if monitor is not None:
+            monitor.cancel()
+            await asyncio.gather(monitor, return_exceptions=True)
         await manager.stop_workers()
 
 
@@ -327,6 +587,8 @@ def main():
     """Main entry point"""
     if len(sys.argv) > 1 and sys.argv[1] == "--standalone":
         # Run as standalone process
+        from attachment_worker import install_event_loop_policy
+        install_event_loop_policy()
         asyncio.run(standalone_runner())
     else:
         # Show usage
@@ -350,7 +612,8 @@ Worker Runner Usage:
        await worker_manager.shutdown()
 
 3. Environment variables:
-   MAX_CONCURRENT_WORKERS=2  # Number of worker processes
+   MAX_CONCURRENT_WORKERS=2  # Number of workers
+   WORKER_MODE=async         # async (tasks sharing one Redis pool) or process
    REDIS_HOST=localhost
    REDIS_PORT=6379
    EMAIL_QUEUE_NAME=email_attachments